@@ -2,11 +2,19 @@
 
 import os
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
 import pandas as pd
 import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
+from etl.schema import TRACK_DTYPES, ARTIST_DTYPES, apply_schema
+from etl.storage import StorageBackend, DuckDBBackend
+from etl.transform import song_key
+
+try:
+    import duckdb
+except ImportError:  # duckdb is optional; the CSV files are read otherwise
+    duckdb = None
 
 # CONFIG
 load_dotenv()
@@ -14,39 +22,184 @@ load_dotenv()
 DATA_DIR = Path("data")
 TRACKS_CSV = DATA_DIR / "tracks.csv"
 ARTISTS_CSV = DATA_DIR / "artists.csv"
+# Written by `python -m etl.run_etl --backend duckdb`; preferred over the CSVs when present
+DUCKDB_PATH = Path(os.getenv("DASHBOARD_DUCKDB", DATA_DIR / "spotify.duckdb"))
 
 # BTS Members
 BTS_MEMBERS = ["BTS", "RM", "Jin", "j-hope", "Jimin", "V", "Jung Kook", "Agust D", "SUGA"]
 
 
 # DATA LOADING
-@st.cache_data(ttl=300)
-def load_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
-    try:
-        tracks = pd.read_csv(TRACKS_CSV)
-        artists = pd.read_csv(ARTISTS_CSV)
-        return tracks, artists
-    except Exception as e:
-        st.error(f"Failed to load data: {e}")
-        st.stop()
+def _read_csv() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    tracks, artists = pd.read_csv(TRACKS_CSV), pd.read_csv(ARTISTS_CSV)
+    return apply_schema(tracks, TRACK_DTYPES), apply_schema(artists, ARTIST_DTYPES)
 
 
 # DATA PROCESSING
 def process_tracks(df: pd.DataFrame) -> pd.DataFrame:
-    """Add base_name and is_bts columns."""
+    """Add is_bts and duration_min columns (base_name is precomputed by the ETL)."""
     df = df.copy()
-    s = df["track_name"].astype(str)
-    s = s.str.replace(r"\s*\(.*?\)", "", regex=True)
-    s = s.str.replace(r"- Japanese ver\.?", "", regex=True, case=False)
-    s = s.str.replace(r"- Instrumental", "", regex=True, case=False)
-    s = s.str.replace(r"- Remix", "", regex=True, case=False)
-    s = s.str.replace(r"- \w+ Ver\.?", "", regex=True, case=False)
-    df["base_name"] = s.str.strip()
+    if "base_name" not in df.columns:
+        # Exports from before the ETL stored base_name
+        df["base_name"] = df["track_name"].map(song_key).astype("category")
     df["is_bts"] = df["artist_name"].isin(BTS_MEMBERS)
     df["duration_min"] = df["duration_ms"] / 60000
     return df
 
 
+# AGGREGATES
+# The sections only chart a few small tables. Read from the ETL's DuckDB file,
+# they are computed there in SQL; read from the CSVs, in pandas. Both builders
+# return the same shapes (see tests/test_app.py).
+POP_LABELS = ["0-19", "20-39", "40-59", "60-79", "80-100"]
+DUR_LABELS = ["<2 min", "2-3 min", "3-4 min", "4-5 min", "5+ min"]
+
+IS_BTS_SQL = "artist_name IN ({})".format(", ".join("'" + m.replace("'", "''") + "'" for m in BTS_MEMBERS))
+
+DASHBOARD_QUERIES = {
+    "summary": f"""
+        SELECT COUNT(*) AS total_tracks,
+               COUNT(DISTINCT base_name) AS unique_songs,
+               COUNT(*) FILTER (WHERE {IS_BTS_SQL}) AS bts_tracks,
+               AVG(popularity) AS avg_pop,
+               MAX(popularity) AS max_pop,
+               AVG(duration_ms) / 60000 AS avg_dur,
+               COUNT(*) FILTER (WHERE popularity >= 60) AS high_pop,
+               COUNT(*) FILTER (WHERE duration_ms >= 120000 AND duration_ms < 240000) AS standard_dur,
+               (SELECT COUNT(DISTINCT artist_name) FROM artists) AS num_artists
+        FROM tracks
+    """,
+    "songs": """
+        SELECT base_name AS "Song", MIN(artist_name) AS "Artist",
+               COUNT(*) AS "Versions", MAX(popularity) AS "Max Pop"
+        FROM tracks
+        WHERE base_name IS NOT NULL
+        GROUP BY base_name
+        ORDER BY "Versions" DESC, "Song"
+    """,
+    "artists": f"""
+        SELECT s.artist_name, s."Tracks", s."Avg Pop", s.is_bts, a.followers
+        FROM (
+            SELECT artist_name, COUNT(*) AS "Tracks", AVG(popularity) AS "Avg Pop", {IS_BTS_SQL} AS is_bts
+            FROM tracks
+            WHERE artist_name IS NOT NULL
+            GROUP BY artist_name
+        ) s
+        LEFT JOIN artists a ON a.artist_name = s.artist_name
+        ORDER BY s."Tracks" DESC, s.artist_name
+    """,
+    "popularity": """
+        SELECT CASE WHEN popularity < 20 THEN '0-19' WHEN popularity < 40 THEN '20-39'
+                    WHEN popularity < 60 THEN '40-59' WHEN popularity < 80 THEN '60-79'
+                    ELSE '80-100' END AS "Range",
+               COUNT(*) AS "Tracks"
+        FROM tracks
+        WHERE popularity IS NOT NULL
+        GROUP BY 1
+    """,
+    "duration": """
+        SELECT CASE WHEN duration_ms < 120000 THEN '<2 min' WHEN duration_ms < 180000 THEN '2-3 min'
+                    WHEN duration_ms < 240000 THEN '3-4 min' WHEN duration_ms < 300000 THEN '4-5 min'
+                    ELSE '5+ min' END AS "Range",
+               COUNT(*) AS "Tracks"
+        FROM tracks
+        WHERE duration_ms IS NOT NULL
+        GROUP BY 1
+    """,
+}
+
+
+def _range_counts(counts: pd.Series, labels) -> pd.DataFrame:
+    """Counts per range label, in chart order, with empty ranges as 0."""
+    return pd.DataFrame({"Range": labels, "Tracks": [int(counts.get(label, 0)) for label in labels]})
+
+
+def aggregate_sql(backend: StorageBackend) -> Dict[str, Any]:
+    """Dashboard aggregates computed by the backend (DuckDB) in SQL."""
+    results = {name: backend.query(sql) for name, sql in DASHBOARD_QUERIES.items()}
+    stats = {
+        "summary": {k: v[0] for k, v in results["summary"].to_dict("list").items()},
+        "songs": results["songs"],
+        "artists": results["artists"],
+    }
+    for name, labels in (("popularity", POP_LABELS), ("duration", DUR_LABELS)):
+        stats[name] = _range_counts(results[name].set_index("Range")["Tracks"], labels)
+    return stats
+
+
+def aggregate_frames(tracks_df: pd.DataFrame, artists_df: pd.DataFrame) -> Dict[str, Any]:
+    """The same aggregates as aggregate_sql, from frames read off the CSVs."""
+    tracks_df = process_tracks(tracks_df)
+    # Plain strings: min() is undefined on unordered categoricals
+    names = tracks_df[["base_name", "artist_name"]].astype(object)
+
+    songs = (
+        tracks_df.assign(base_name=names["base_name"], artist_name=names["artist_name"])
+        .groupby("base_name", as_index=False)
+        .agg({"track_id": "count", "popularity": "max", "artist_name": "min"})
+        .rename(columns={"track_id": "Versions", "popularity": "Max Pop", "artist_name": "Artist", "base_name": "Song"})
+        .sort_values(["Versions", "Song"], ascending=[False, True], ignore_index=True)
+    )[["Song", "Artist", "Versions", "Max Pop"]]
+
+    artists = (
+        tracks_df.assign(artist_name=names["artist_name"])
+        .groupby("artist_name", as_index=False)
+        .agg({"track_id": "count", "popularity": "mean", "is_bts": "first"})
+        .rename(columns={"track_id": "Tracks", "popularity": "Avg Pop"})
+        .merge(artists_df[["artist_name", "followers"]].astype({"artist_name": object}),
+               on="artist_name", how="left")
+        .sort_values(["Tracks", "artist_name"], ascending=[False, True], ignore_index=True)
+    )
+
+    popularity = pd.cut(tracks_df["popularity"], [0, 20, 40, 60, 80, np.inf], right=False, labels=POP_LABELS)
+    duration = pd.cut(tracks_df["duration_min"], [0, 2, 3, 4, 5, np.inf], right=False, labels=DUR_LABELS)
+
+    return {
+        "summary": {
+            "total_tracks": len(tracks_df),
+            "unique_songs": tracks_df["base_name"].nunique(),
+            "bts_tracks": int(tracks_df["is_bts"].sum()),
+            "avg_pop": tracks_df["popularity"].mean(),
+            "max_pop": tracks_df["popularity"].max(),
+            "avg_dur": tracks_df["duration_min"].mean(),
+            "high_pop": int((tracks_df["popularity"] >= 60).sum()),
+            "standard_dur": int(((tracks_df["duration_min"] >= 2) & (tracks_df["duration_min"] < 4)).sum()),
+            "num_artists": artists_df["artist_name"].nunique(),
+        },
+        "songs": songs,
+        "artists": artists,
+        "popularity": _range_counts(popularity.value_counts(), POP_LABELS),
+        "duration": _range_counts(duration.value_counts(), DUR_LABELS),
+    }
+
+
+def _duckdb_stats() -> Optional[Dict[str, Any]]:
+    """Aggregates from the ETL's DuckDB file; None if it is missing or locked by a running ETL."""
+    if duckdb is None or not DUCKDB_PATH.exists():
+        return None
+    try:
+        backend = DuckDBBackend(str(DUCKDB_PATH), read_only=True)
+    except duckdb.IOException:
+        # One writer or many readers: an ETL run holds the file, so use the CSVs meanwhile
+        return None
+    try:
+        return aggregate_sql(backend)
+    finally:
+        backend.close()
+
+
+@st.cache_data(ttl=300)
+def load_stats() -> Dict[str, Any]:
+    try:
+        stats = _duckdb_stats()
+        if stats is None:
+            stats = aggregate_frames(*_read_csv())
+        return stats
+    except Exception as e:
+        st.error(f"Failed to load data: {e}")
+        st.stop()
+
+
 # CUSTOM CSS
 def inject_css():
     st.markdown("""
@@ -191,17 +344,18 @@ def inject_css():
 
 # SECTIONS
 
-def render_overview(tracks_df, artists_df):
+def render_overview(stats):
     """Overview / Summary section like Country Profile"""
     st.markdown("<div class='section-title'>Dashboard Overview</div>", unsafe_allow_html=True)
     
     # Summary text box
-    total_tracks = len(tracks_df)
-    unique_songs = tracks_df["base_name"].nunique()
-    bts_tracks = tracks_df[tracks_df["is_bts"]].shape[0]
+    summary = stats["summary"]
+    total_tracks = summary["total_tracks"]
+    unique_songs = summary["unique_songs"]
+    bts_tracks = summary["bts_tracks"]
     collab_tracks = total_tracks - bts_tracks
-    top_song = tracks_df.groupby("base_name").size().idxmax()
-    top_artist = tracks_df.groupby("artist_name").size().idxmax()
+    top_song = stats["songs"]["Song"].iloc[0]
+    top_artist = stats["artists"]["artist_name"].iloc[0]
     
     st.markdown(f"""
     <div style="background: rgba(45, 55, 72, 0.9); padding: 1rem; border-radius: 8px; margin-bottom: 1rem; border: 1px solid #333;">
@@ -240,7 +394,7 @@ def render_overview(tracks_df, artists_df):
         """, unsafe_allow_html=True)
     
     with col3:
-        num_artists = artists_df["artist_name"].nunique()
+        num_artists = summary["num_artists"]
         st.markdown(f"""
         <div class='metric-container'>
             <div class='metric-label'>Total Artists</div>
@@ -252,7 +406,7 @@ def render_overview(tracks_df, artists_df):
     col4, col5, col6 = st.columns(3)
     
     with col4:
-        avg_pop = tracks_df["popularity"].mean()
+        avg_pop = summary["avg_pop"]
         st.markdown(f"""
         <div class='metric-container'>
             <div class='metric-label'>Avg Popularity</div>
@@ -262,7 +416,7 @@ def render_overview(tracks_df, artists_df):
         """, unsafe_allow_html=True)
     
     with col5:
-        max_pop = tracks_df["popularity"].max()
+        max_pop = summary["max_pop"]
         st.markdown(f"""
         <div class='metric-container'>
             <div class='metric-label'>Max Popularity</div>
@@ -272,7 +426,7 @@ def render_overview(tracks_df, artists_df):
         """, unsafe_allow_html=True)
     
     with col6:
-        avg_dur = tracks_df["duration_min"].mean()
+        avg_dur = summary["avg_dur"]
         st.markdown(f"""
         <div class='metric-container'>
             <div class='metric-label'>Avg Duration</div>
@@ -282,21 +436,11 @@ def render_overview(tracks_df, artists_df):
         """, unsafe_allow_html=True)
 
 
-def render_songs(tracks_df):
+def render_songs(stats):
     """Top Songs section"""
     st.markdown("<div class='section-title'>Top Songs Analysis</div>", unsafe_allow_html=True)
     
-    song_stats = (
-        tracks_df
-        .groupby("base_name", as_index=False)
-        .agg({
-            "track_id": "count",
-            "popularity": "max",
-            "artist_name": "first"
-        })
-        .rename(columns={"track_id": "Versions", "popularity": "Max Pop", "artist_name": "Artist", "base_name": "Song"})
-        .sort_values("Versions", ascending=False)
-    )
+    song_stats = stats["songs"]
     
     col1, col2 = st.columns([2, 1])
     
@@ -351,27 +495,11 @@ def render_songs(tracks_df):
         """, unsafe_allow_html=True)
 
 
-def render_artists(tracks_df, artists_df):
+def render_artists(stats):
     """Top Artists section"""
     st.markdown("<div class='section-title'>Artist Rankings</div>", unsafe_allow_html=True)
     
-    artist_stats = (
-        tracks_df
-        .groupby("artist_name", as_index=False)
-        .agg({
-            "track_id": "count",
-            "popularity": "mean",
-            "is_bts": "first"
-        })
-        .rename(columns={"track_id": "Tracks", "popularity": "Avg Pop"})
-        .sort_values("Tracks", ascending=False)
-    )
-    
-    artist_stats = artist_stats.merge(
-        artists_df[["artist_name", "followers"]],
-        on="artist_name",
-        how="left"
-    )
+    artist_stats = stats["artists"]
     
     col1, col2 = st.columns([2, 1])
     
@@ -428,53 +556,27 @@ def render_artists(tracks_df, artists_df):
         """, unsafe_allow_html=True)
 
 
-def render_analytics(tracks_df):
+def render_analytics(stats):
     """Analytics section with charts"""
     st.markdown("<div class='section-title'>Analytics</div>", unsafe_allow_html=True)
     
+    summary = stats["summary"]
+    total_tracks = summary["total_tracks"]
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown('<div class="section-header">Popularity Distribution</div>', unsafe_allow_html=True)
+        st.bar_chart(stats["popularity"], x="Range", y="Tracks", height=200)
         
-        def get_pop_label(p):
-            if p < 20: return "0-19"
-            elif p < 40: return "20-39"
-            elif p < 60: return "40-59"
-            elif p < 80: return "60-79"
-            else: return "80-100"
-        
-        tracks_df["pop_label"] = tracks_df["popularity"].apply(get_pop_label)
-        pop_counts = tracks_df["pop_label"].value_counts()
-        
-        labels_pop = ["0-19", "20-39", "40-59", "60-79", "80-100"]
-        pop_values = [int(pop_counts.get(lbl, 0)) for lbl in labels_pop]
-        pop_chart_df = pd.DataFrame({"Range": labels_pop, "Tracks": pop_values})
-        st.bar_chart(pop_chart_df, x="Range", y="Tracks", height=200)
-        
-        high_pop = tracks_df[tracks_df["popularity"] >= 60].shape[0]
-        st.caption(f"{high_pop} tracks ({high_pop*100//len(tracks_df)}%) have popularity 60+")
+        high_pop = summary["high_pop"]
+        st.caption(f"{high_pop} tracks ({high_pop*100//total_tracks}%) have popularity 60+")
     
     with col2:
         st.markdown('<div class="section-header">Duration Distribution</div>', unsafe_allow_html=True)
+        st.bar_chart(stats["duration"], x="Range", y="Tracks", height=200)
         
-        def get_dur_label(m):
-            if m < 2: return "<2 min"
-            elif m < 3: return "2-3 min"
-            elif m < 4: return "3-4 min"
-            elif m < 5: return "4-5 min"
-            else: return "5+ min"
-        
-        tracks_df["dur_label"] = tracks_df["duration_min"].apply(get_dur_label)
-        dur_counts = tracks_df["dur_label"].value_counts()
-        
-        labels_dur = ["<2 min", "2-3 min", "3-4 min", "4-5 min", "5+ min"]
-        dur_values = [int(dur_counts.get(lbl, 0)) for lbl in labels_dur]
-        dur_chart_df = pd.DataFrame({"Range": labels_dur, "Tracks": dur_values})
-        st.bar_chart(dur_chart_df, x="Range", y="Tracks", height=200)
-        
-        standard = tracks_df[(tracks_df["duration_min"] >= 2) & (tracks_df["duration_min"] < 4)].shape[0]
-        st.caption(f"{standard} tracks ({standard*100//len(tracks_df)}%) are 2-4 min")
+        standard = summary["standard_dur"]
+        st.caption(f"{standard} tracks ({standard*100//total_tracks}%) are 2-4 min")
     
     # Data Quality Row
     st.markdown('<div class="section-header">Data Quality</div>', unsafe_allow_html=True)
@@ -482,8 +584,8 @@ def render_analytics(tracks_df):
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Data Complete", "100%")
     c2.metric("No Duplicates", "Yes")
-    c3.metric("Avg Duration", f"{tracks_df['duration_min'].mean():.1f} min")
-    c4.metric("Max Popularity", f"{tracks_df['popularity'].max()}")
+    c3.metric("Avg Duration", f"{summary['avg_dur']:.1f} min")
+    c4.metric("Max Popularity", f"{summary['max_pop']}")
 
 
 # MAIN APP
@@ -498,14 +600,13 @@ def main():
     inject_css()
     
     # Load data
-    tracks_df, artists_df = load_data()
+    stats = load_stats()
+    summary = stats["summary"]
     
-    if tracks_df.empty:
+    if not summary["total_tracks"]:
         st.warning("No data found. Please check data files.")
         st.stop()
     
-    tracks_df = process_tracks(tracks_df)
-    
     # SIDEBAR NAVIGATION
     st.sidebar.title("Navigation")
     section = st.sidebar.selectbox(
@@ -520,9 +621,9 @@ def main():
     st.sidebar.markdown(f"""
     <div style="font-size: 0.75rem; color: #888;">
         <b>Data Summary</b><br>
-        Tracks: {len(tracks_df):,}<br>
-        Artists: {artists_df['artist_name'].nunique()}<br>
-        Songs: {tracks_df['base_name'].nunique()}
+        Tracks: {summary['total_tracks']:,}<br>
+        Artists: {summary['num_artists']}<br>
+        Songs: {summary['unique_songs']}
     </div>
     """, unsafe_allow_html=True)
     
@@ -532,11 +633,11 @@ def main():
 
     # TOP METRICS ROW
     if section != "Overview":
-        total_tracks = len(tracks_df)
-        unique_songs = tracks_df["base_name"].nunique()
-        num_artists = artists_df["artist_name"].nunique()
-        avg_pop = tracks_df["popularity"].mean()
-        max_pop = tracks_df["popularity"].max()
+        total_tracks = summary["total_tracks"]
+        unique_songs = summary["unique_songs"]
+        num_artists = summary["num_artists"]
+        avg_pop = summary["avg_pop"]
+        max_pop = summary["max_pop"]
         
         st.markdown(f"""
         <div style="display: grid; grid-template-columns: repeat(5, 1fr); gap: 0.8rem; margin: -1.5rem 0 2rem;">
@@ -567,13 +668,13 @@ def main():
     
     # RENDER SELECTED SECTION
     if section == "Overview":
-        render_overview(tracks_df, artists_df)
+        render_overview(stats)
     elif section == "Top Songs":
-        render_songs(tracks_df)
+        render_songs(stats)
     elif section == "Top Artists":
-        render_artists(tracks_df, artists_df)
+        render_artists(stats)
     elif section == "Analytics":
-        render_analytics(tracks_df)
+        render_analytics(stats)
     
     # FOOTER
     st.markdown("""
@@ -1,14 +1,16 @@
 # app.py 
 
-import os
+from datetime import date, timedelta
 from pathlib import Path
 from typing import Tuple
 import pandas as pd
 import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 import pymysql
+from etl.db import get_engine
+from etl.snapshots import popularity_trend
+from etl.transform import song_key
 
 # CONFIG
 load_dotenv()
@@ -21,11 +23,8 @@ BTS_MEMBERS = ["BTS", "RM", "Jin", "j-hope", "Jimin", "V", "Jung Kook", "Agust D
 def load_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Load tracks & artists directly from MySQL instead of CSV."""
     try:
-        conn_str = (
-            f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
-            f"@{os.getenv('MYSQL_HOST')}:{os.getenv('MYSQL_PORT')}/{os.getenv('MYSQL_DB')}"
-        )
-        engine = create_engine(conn_str)
+        # Pooled and shared across reruns, so the 5-minute cache refresh reuses connections
+        engine = get_engine()
 
         tracks = pd.read_sql("SELECT * FROM tracks", engine)
         artists = pd.read_sql("SELECT * FROM artists", engine)
@@ -36,17 +35,26 @@ def load_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
         st.error(f"Unable to connect to MySQL: {e}")
         st.stop()
 
+@st.cache_data(ttl=300)
+def load_popularity_trend(track_ids: Tuple[str, ...], days: int) -> pd.DataFrame:
+    """Popularity history for a few tracks, downsampled by MySQL (empty if not recorded yet)."""
+    end = date.today() + timedelta(days=1)
+    try:
+        return popularity_trend("track", list(track_ids), end - timedelta(days=days), end)
+    except Exception:
+        # popularity_snapshots is created by `python -m etl.migrate`
+        return pd.DataFrame()
+
 # DATA PROCESSING
 def process_tracks(df: pd.DataFrame) -> pd.DataFrame:
-    """Add base_name and is_bts columns."""
+    """Add is_bts column (base_name is precomputed by the ETL)."""
     df = df.copy()
-    s = df["track_name"].astype(str)
-    s = s.str.replace(r"\s*\(.*?\)", "", regex=True)
-    s = s.str.replace(r"- Japanese ver\.?", "", regex=True, case=False)
-    s = s.str.replace(r"- Instrumental", "", regex=True, case=False)
-    s = s.str.replace(r"- Remix", "", regex=True, case=False)
-    s = s.str.replace(r"- \w+ Ver\.?", "", regex=True, case=False)
-    df["base_name"] = s.str.strip()
+    if "base_name" not in df.columns:
+        df["base_name"] = None
+    # Rows loaded before the ETL stored base_name
+    missing = df["base_name"].isna()
+    if missing.any():
+        df.loc[missing, "base_name"] = df.loc[missing, "track_name"].map(song_key)
     df["is_bts"] = df["artist_name"].isin(BTS_MEMBERS)
     return df
 
@@ -322,6 +330,24 @@ def main():
             standard = tracks_df[(tracks_df["duration_min"] >= 2) & (tracks_df["duration_min"] < 4)].shape[0]
             st.caption(f" {standard} tracks ({standard*100//len(tracks_df)}%) are 2-4 min (radio length)")
         
+        st.markdown("---")
+        st.markdown('<div class="section-title">Popularity Trend <span class="badge">TOP 5</span></div>', unsafe_allow_html=True)
+
+        top_tracks = tracks_df.nlargest(5, "popularity")[["track_id", "track_name"]]
+        days = st.select_slider("Period", options=[30, 90, 365, 730], value=90,
+                                format_func=lambda d: f"{d} days")
+        trend = load_popularity_trend(tuple(top_tracks["track_id"]), days)
+
+        if trend.empty:
+            st.caption("No popularity history yet; it builds up with each ETL run.")
+        else:
+            names = dict(zip(top_tracks["track_id"], top_tracks["track_name"]))
+            trend_chart_df = (
+                trend.assign(Track=trend["entity_id"].map(names))
+                .pivot_table(index="period", columns="Track", values="popularity")
+            )
+            st.line_chart(trend_chart_df, height=300)
+
         st.markdown("---")
         st.markdown('<div class="section-title">Data Quality</div>', unsafe_allow_html=True)
         
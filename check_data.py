@@ -1,26 +1,15 @@
 # check_data.py
 
-import os
 import pandas as pd
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
-
-load_dotenv()
-
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
-MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
-MYSQL_DB = os.getenv("MYSQL_DB", "spotify_bts")
-
-DB_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+from etl.config import MYSQL_DB
+from etl.db import get_engine
 
 print("=" * 60)
 print("DATABASE DIAGNOSTIC REPORT")
 print("=" * 60)
 
 try:
-    engine = create_engine(DB_URL, echo=False)
+    engine = get_engine()
     print(f" Connected to: {MYSQL_DB}")
     print()
     
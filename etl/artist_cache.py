@@ -0,0 +1,104 @@
+# etl/artist_cache.py
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+from .config import ARTIST_CACHE_PATH, ARTIST_CACHE_TTL, ARTIST_CACHE_MAX_ENTRIES
+
+
+class ArtistCache:
+    """SQLite-backed artist details cache with a per-entry TTL and LRU size bound."""
+
+    def __init__(self,
+                 path: str = ARTIST_CACHE_PATH,
+                 ttl: int = ARTIST_CACHE_TTL,
+                 max_entries: int = ARTIST_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artist_cache (
+                artist_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_artist_cache_last_used ON artist_cache (last_used)"
+        )
+        self.conn.commit()
+
+    def get_many(self, artist_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return fresh cached details for the given ids; missing or stale ids are left out."""
+        now = time.time()
+        found = {}
+        ids = [a for a in dict.fromkeys(artist_ids) if a]
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT artist_id, payload FROM artist_cache "
+                f"WHERE artist_id IN ({placeholders}) AND fetched_at > ?",
+                [*chunk, now - self.ttl],
+            ).fetchall()
+            found.update((artist_id, json.loads(payload)) for artist_id, payload in rows)
+
+        if found:
+            self.conn.executemany(
+                "UPDATE artist_cache SET last_used = ? WHERE artist_id = ?",
+                [(now, artist_id) for artist_id in found],
+            )
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, details: Dict[str, Dict[str, Any]]):
+        """Store artist details, keeping only the fields enrichment needs."""
+        if not details:
+            return
+
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO artist_cache (artist_id, payload, fetched_at, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (artist_id, json.dumps({
+                    "genres": d.get("genres", []),
+                    "followers": {"total": d.get("followers", {}).get("total")},
+                    "popularity": d.get("popularity"),
+                }), now, now)
+                for artist_id, d in details.items()
+            ],
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries."""
+        self.conn.execute(
+            "DELETE FROM artist_cache WHERE artist_id IN ("
+            "SELECT artist_id FROM artist_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        print(f"Artist cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)")
+
+    def close(self):
+        self.conn.close()
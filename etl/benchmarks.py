@@ -0,0 +1,276 @@
+# etl/benchmarks.py
+#
+# Micro-benchmarks for the ETL stages, on synthetic data.
+#
+#   python -m etl.benchmarks transform --rows 100000
+#   python -m etl.benchmarks load --rows 10000 1000000     (needs the MySQL .env)
+#   python -m etl.benchmarks schema --rows 1000000          (needs the MySQL .env)
+
+import argparse
+import time
+from typing import Callable, Dict, Any, List, Optional
+import pandas as pd
+
+from .fake_spotify import generate_dataset
+from .transform import normalize_tracks, song_key
+
+
+def _timeit(fn: Callable, repeat: int = 3, setup: Optional[Callable] = None) -> float:
+    """Best wall time over `repeat` runs; setup (untimed) runs before each one."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic_items(rows: int) -> List[Dict[str, Any]]:
+    dataset = generate_dataset(n_tracks=rows, n_artists=max(rows // 20, 1))
+    items = next(iter(dataset["playlists"].values()))["items"]
+    # Repeat ~5% of tracks so dedupe has real work to do
+    return items + items[: rows // 20]
+
+
+# TRANSFORM
+def _normalize_tracks_rowwise(raw_items, playlist_name, playlist_id) -> pd.DataFrame:
+    """The original dict-per-row implementation, kept as the benchmark baseline."""
+    rows = []
+    for item in raw_items:
+        track = item.get("track")
+        if not track:
+            continue
+        artist = track["artists"][0] if track.get("artists") else {}
+        rows.append({
+            "track_id": track.get("id"),
+            "track_name": track.get("name"),
+            "album_name": track.get("album", {}).get("name"),
+            "artist_id": artist.get("id"),
+            "artist_name": artist.get("name"),
+            "popularity": track.get("popularity"),
+            "duration_ms": track.get("duration_ms"),
+            "added_at": item.get("added_at").replace("Z", ""),
+            "playlist_name": playlist_name,
+            "playlist_id": playlist_id,
+        })
+    return pd.DataFrame(rows).drop_duplicates(subset=["track_id"])
+
+
+def bench_transform(rows: int, repeat: int):
+    """Row-wise baseline vs normalize_tracks.
+
+    The columnar path also computes base_name and parses added_at into
+    datetime64, which the baseline leaves to the dashboards; both are
+    included in its time.
+    """
+    items = _synthetic_items(rows)
+    print(f"normalize_tracks on {len(items):,} items (best of {repeat})")
+
+    baseline = _timeit(lambda: _normalize_tracks_rowwise(items, "bench", "bench"), repeat)
+    # Cold song_key memo on every repeat, as in a fresh nightly process
+    columnar = _timeit(lambda: normalize_tracks(items, "bench", "bench"), repeat, setup=song_key.cache_clear)
+
+    print(f"  row-wise : {baseline:8.3f}s  {len(items) / baseline:12,.0f} items/s")
+    print(f"  columnar : {columnar:8.3f}s  {len(items) / columnar:12,.0f} items/s")
+    print(f"  speedup  : {baseline / columnar:8.1f}x")
+
+
+# LOAD
+def _upsert_rowwise(df: pd.DataFrame, table_name: str, pk: str):
+    """The original one-statement-per-row upsert, kept as the benchmark baseline."""
+    from sqlalchemy.dialects.mysql import insert
+    from .db import get_engine, get_table
+    from .load import _to_records
+
+    table = get_table(table_name)
+    with get_engine().begin() as conn:
+        for row_dict in _to_records(df):
+            stmt = insert(table).values(**row_dict)
+            update_dict = {col: row_dict[col] for col in row_dict if col != pk}
+            conn.execute(stmt.on_duplicate_key_update(**update_dict))
+
+
+def bench_load(row_counts: List[int], batch_size: int, rowwise_limit: int):
+    """Row-wise vs batched vs LOAD DATA LOCAL INFILE upserts into a scratch copy of `tracks`."""
+    from sqlalchemy import text
+    from .db import get_engine
+    from .load import upsert_df, infile_upsert_df
+
+    engine = get_engine()
+    scratch = "bench_tracks"
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {scratch}"))
+        # LIKE copies columns and indexes but not the artists foreign key
+        conn.execute(text(f"CREATE TABLE {scratch} LIKE tracks"))
+
+    try:
+        for rows in row_counts:
+            df = normalize_tracks(_synthetic_items(rows)[:rows], "bench", "bench")
+            print(f"upsert of {len(df):,} rows into {scratch}")
+
+            def reset():
+                with engine.begin() as conn:
+                    conn.execute(text(f"TRUNCATE TABLE {scratch}"))
+
+            if rows <= rowwise_limit:
+                reset()
+                start = time.perf_counter()
+                _upsert_rowwise(df, scratch, "track_id")
+                rowwise = time.perf_counter() - start
+                print(f"  row-wise          : {rowwise:8.2f}s  {len(df) / rowwise:10,.0f} rows/s")
+            else:
+                rowwise = None
+                print(f"  row-wise          : skipped (> {rowwise_limit:,} rows)")
+
+            runs = [
+                ("batched insert", True, lambda: upsert_df(df, scratch, "track_id", batch_size=batch_size)),
+                ("batched update", False, lambda: upsert_df(df, scratch, "track_id", batch_size=batch_size)),
+                ("infile insert", True, lambda: infile_upsert_df(df, scratch, "track_id")),
+                ("infile update", False, lambda: infile_upsert_df(df, scratch, "track_id")),
+            ]
+            for label, do_reset, load in runs:
+                if do_reset:
+                    reset()
+                start = time.perf_counter()
+                bulk = load()
+                seconds = time.perf_counter() - start
+                if bulk is False:
+                    print(f"  {label:<18}: LOCAL INFILE disabled (fell back to batched upserts)")
+                    continue
+                speedup = f"  ({rowwise / seconds:.1f}x)" if rowwise and do_reset else ""
+                print(f"  {label:<18}: {seconds:8.2f}s  {len(df) / seconds:10,.0f} rows/s{speedup}")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {scratch}"))
+
+
+# SCHEMA
+# tracks as created by the schema.sql baseline, minus the artists foreign key
+SCHEMA_V1_DDL = """
+CREATE TABLE {table} (
+    track_id VARCHAR(50) PRIMARY KEY,
+    track_name VARCHAR(255) NOT NULL,
+    base_name VARCHAR(255),
+    album_name VARCHAR(255),
+    artist_id VARCHAR(50),
+    artist_name VARCHAR(255),
+    popularity INT,
+    duration_ms INT,
+    added_at VARCHAR(30),
+    playlist_name VARCHAR(255),
+    playlist_id VARCHAR(50),
+    row_hash BIGINT UNSIGNED,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+SCHEMA_QUERIES = {
+    "playlist date range": (
+        "SELECT COUNT(*) FROM {table} "
+        "WHERE playlist_id = :playlist_id AND added_at >= :start AND added_at < :end"
+    ),
+    "tracks by artist": "SELECT track_name, popularity FROM {table} WHERE artist_id = :artist_id",
+    "versions of a song": "SELECT track_id, track_name FROM {table} WHERE base_name = :base_name",
+}
+
+
+def _time_queries(engine, table: str, params: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    from sqlalchemy import text
+
+    timings = {}
+    with engine.connect() as conn:
+        for label, sql in SCHEMA_QUERIES.items():
+            stmt = text(sql.format(table=table))
+            timings[label] = _timeit(lambda: conn.execute(stmt, params).fetchall(), repeat)
+    return timings
+
+
+def bench_schema(rows: int, playlists: int, repeat: int):
+    """Query timings on a synthetic tracks table before and after migrations/0001."""
+    import re
+    from sqlalchemy import text
+    from .db import get_engine
+    from .load import infile_upsert_df
+    from .migrate import discover, split_statements
+
+    engine = get_engine()
+    scratch = "bench_schema_tracks"
+
+    df = normalize_tracks(_synthetic_items(rows)[:rows], "bench", "bench")
+    df["playlist_id"] = pd.Categorical([f"bench{i % playlists:04d}" for i in range(len(df))])
+    sample = df.iloc[len(df) // 2]
+    params = {
+        "playlist_id": sample["playlist_id"],
+        "start": "2020-06-01 00:00:00",
+        "end": "2020-07-01 00:00:00",
+        "artist_id": sample["artist_id"],
+        "base_name": sample["base_name"],
+    }
+
+    # The v2 migration, retargeted at the scratch table (artists statements and the
+    # baseline catch-up skipped; the scratch table already has those columns)
+    version, name, path = discover()[0]
+    migration = [
+        re.sub(r"\btracks\b", scratch, stmt)
+        for stmt in split_statements(path.read_text(encoding="utf-8"))
+        if re.search(r"\btracks\b", stmt) and "ADD COLUMN" not in stmt
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {scratch}"))
+        conn.execute(text(SCHEMA_V1_DDL.format(table=scratch)))
+
+    try:
+        print(f"Loading {len(df):,} rows into {scratch} (v1 schema)")
+        infile_upsert_df(df, scratch, "track_id")
+        before = _time_queries(engine, scratch, params, repeat)
+
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            for stmt in migration:
+                conn.execute(text(stmt))
+        print(f"Applied {version:04d}_{name} in {time.perf_counter() - start:.1f}s")
+        after = _time_queries(engine, scratch, params, repeat)
+
+        print(f"{'query':<22}{'v1':>10}{'v2':>10}{'speedup':>10}   (best of {repeat})")
+        for label in SCHEMA_QUERIES:
+            speedup = before[label] / after[label] if after[label] else float("inf")
+            print(f"{label:<22}{before[label] * 1000:>8.1f}ms{after[label] * 1000:>8.1f}ms{speedup:>9.1f}x")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {scratch}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETL stage benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("transform", help="row-wise vs columnar normalize_tracks")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("load", help="row-wise vs batched vs LOCAL INFILE upserts (MySQL)")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--rowwise-limit", type=int, default=1_000_000,
+                   help="Skip the row-wise baseline above this many rows")
+
+    p = sub.add_parser("schema", help="query timings before/after the v2 migration (MySQL)")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--playlists", type=int, default=50, help="Distinct playlist_ids in the table")
+    p.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == "transform":
+        bench_transform(args.rows, args.repeat)
+    elif args.command == "load":
+        bench_load(args.rows, args.batch_size, args.rowwise_limit)
+    elif args.command == "schema":
+        bench_schema(args.rows, args.playlists, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
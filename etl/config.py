@@ -10,9 +10,72 @@ load_dotenv()
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 
+# MYSQL CONNECTION (engine built lazily by etl/db.py)
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
+MYSQL_DB = os.getenv("MYSQL_DB", "spotify_bts")
+
+# STORAGE BACKEND: "mysql", "sqlite" or "duckdb" (see etl/storage.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql")
+STORAGE_PATH = os.getenv("STORAGE_PATH")        # Database file for sqlite/duckdb
+
+# DB CONNECTION POOL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))          # Persistent connections
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))   # Extra connections under load
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds; stay under wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+
+# SPOTIFY ENDPOINTS (override to point at etl/fake_spotify.py for offline runs)
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")
+
+# TOKEN CACHE (shared by the extract scripts)
+TOKEN_CACHE_PATH = os.getenv("SPOTIFY_TOKEN_CACHE", ".cache/spotify_token.json")
+TOKEN_REFRESH_MARGIN = 60       # Refresh this many seconds before expiry
+
+# ARTIST METADATA CACHE
+ARTIST_CACHE_PATH = os.getenv("ARTIST_CACHE_PATH", ".cache/artists.sqlite")
+ARTIST_CACHE_TTL = 7 * 24 * 3600        # Seconds before an entry is refetched
+ARTIST_CACHE_MAX_ENTRIES = 50000        # LRU bound on cached artists
+
+# RAW LANDING ZONE (compressed NDJSON pages, partitioned by playlist and run)
+LANDING_DIR = os.getenv("LANDING_DIR", "landing")
+# Spotify `fields=` projection for landed pages; unset lands whole items so a
+# replay can use fields the transform reads later (see landing.missing_fields)
+LANDING_ITEM_FIELDS = os.getenv("LANDING_ITEM_FIELDS") or None
+
 # GLOBAL ETL CONSTANTS
 MARKET = "US"                   # Force US market to avoid region issues
 MAX_TRACKS_PER_REQUEST = 100    # Spotify pagination limit
+MAX_ARTISTS_PER_REQUEST = 50    # Spotify /artists?ids= limit
+TRANSFORM_CHUNK_SIZE = 5000     # Raw items per chunk in transform_chunks
+SONG_KEY_CACHE_SIZE = 20000     # Track names memoized by transform.song_key (LRU)
+
+# PIPELINED MODE (etl/pipeline.py)
+PIPELINE_QUEUE_SIZE = 4         # Items buffered between two stages before the producer blocks
+PIPELINE_SOURCE_BATCH = 500     # Raw items per queue entry out of the extract stage
+
+# HTTP SESSION / RETRY SETTINGS
+HTTP_POOL_SIZE = 10             # Max keep-alive connections per host
+HTTP_TIMEOUT = 30               # Seconds per request
+MAX_RETRIES = 5                 # Retries on 429 / 5xx / connection errors
+BACKOFF_BASE = 0.5              # Seconds, doubled on each retry
+BACKOFF_MAX = 60                # Cap for a single backoff sleep
+FETCH_WORKERS = 8               # Parallel page fetches in concurrent mode
+PLAYLIST_WORKERS = 8            # Playlists crawled in parallel by etl/run_many.py
+
+# RATE LIMITING (shared by every SpotifyClient in the process; AIMD adjusts
+# both the request rate and the in-flight limit between their min and max)
+RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", "10"))   # Initial token refill rate
+RATE_LIMIT_MIN = float(os.getenv("RATE_LIMIT_MIN", "1"))
+RATE_LIMIT_MAX = float(os.getenv("RATE_LIMIT_MAX", "50"))
+RATE_LIMIT_STEP = float(os.getenv("RATE_LIMIT_STEP", "2"))         # Req/s added per success run
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "20"))        # Token bucket capacity
+CONCURRENCY_START = int(os.getenv("CONCURRENCY_START", "4"))       # Initial in-flight request limit
+CONCURRENCY_MIN = int(os.getenv("CONCURRENCY_MIN", "1"))
+CONCURRENCY_MAX = int(os.getenv("CONCURRENCY_MAX", "16"))
 
 # PROJECT SETTINGS (BTS Project)
 DEFAULT_PLAYLIST_NAME = "bts_all_songs"
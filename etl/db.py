@@ -0,0 +1,82 @@
+# etl/db.py
+#
+# Process-wide SQLAlchemy engines and reflected table metadata. Nothing here
+# touches the database until the first query, so importing ETL modules is free.
+
+import threading
+from typing import Dict, Optional, Tuple
+from sqlalchemy import create_engine, MetaData, Table
+from sqlalchemy.engine import Engine
+from .config import (
+    MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DB,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+)
+
+_engines: Dict[Tuple[str, bool], Engine] = {}
+_metadata: Dict[Engine, MetaData] = {}
+_lock = threading.Lock()
+
+
+def database_url() -> str:
+    return f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+
+
+def _create(url: str, local_infile: bool = False) -> Engine:
+    options = {"future": True, "pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("mysql"):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+        if local_infile:
+            # One loader connection is enough for the bulk path
+            options.update(pool_size=1, connect_args={"local_infile": True})
+    return create_engine(url, **options)
+
+
+def _get(url: Optional[str], local_infile: bool) -> Engine:
+    key = (url or database_url(), local_infile)
+    with _lock:
+        if key not in _engines:
+            _engines[key] = _create(*key)
+        return _engines[key]
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """Pooled engine for url (default: the MySQL settings in etl/config.py), one per process."""
+    return _get(url, local_infile=False)
+
+
+def get_infile_engine(url: Optional[str] = None) -> Engine:
+    """Separate engine with client-side LOCAL INFILE enabled, for etl/load.py's bulk path only.
+
+    With LOCAL INFILE on, the server can ask the client for any file it can
+    read, so the shared engine (dashboards, exports, checks) leaves it off.
+    """
+    return _get(url, local_infile=True)
+
+
+def get_table(table_name: str, engine: Optional[Engine] = None) -> Table:
+    """Reflected table, cached per engine so each table is reflected once per process."""
+    engine = engine or get_engine()
+    with _lock:
+        metadata = _metadata.setdefault(engine, MetaData())
+        if table_name not in metadata.tables:
+            metadata.reflect(bind=engine, only=[table_name])
+        return metadata.tables[table_name]
+
+
+def clear_metadata():
+    """Forget reflected tables, e.g. after a schema migration."""
+    with _lock:
+        _metadata.clear()
+
+
+def dispose_engines():
+    """Close all pooled connections (before forking, or at shutdown)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _metadata.clear()
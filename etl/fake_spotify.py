@@ -0,0 +1,429 @@
+# etl/fake_spotify.py
+#
+# Local stand-in for the Spotify Web API, for offline benchmarking and
+# regression-testing of extraction throughput and retry behavior.
+#
+#   python -m etl.fake_spotify serve --tracks 5000 --latency 0.05 --port 8765
+#   python -m etl.fake_spotify bench --tracks 5000 --latency 0.05 --error-rate 0.05
+#
+# Recorded data: runs landed by the ETL (etl/landing.py) can be served instead of
+# synthetic data, or saved as a --data file:
+#   python -m etl.fake_spotify serve --landed 4U9cBN9vcM4rmDmgjfTSQH
+#   python -m etl.fake_spotify record --landed 4U9cBN9vcM4rmDmgjfTSQH:20240301T020000Z --out bts.json
+#   python -m etl.fake_spotify bench --data bts.json
+#
+# Point the ETL at a running server with:
+#   SPOTIFY_TOKEN_URL=http://127.0.0.1:8765/api/token
+#   SPOTIFY_API_BASE=http://127.0.0.1:8765/v1
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+# SYNTHETIC DATA
+def _fake_id(rng: random.Random) -> str:
+    alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    return "".join(rng.choice(alphabet) for _ in range(22))
+
+
+def generate_dataset(n_tracks: int = 1000,
+                     n_artists: int = 200,
+                     playlist_id: str = "fakeplaylist0000000000",
+                     seed: int = 42) -> Dict[str, Any]:
+    """Build a dataset shaped like Spotify's playlist-item and artist payloads."""
+    rng = random.Random(seed)
+    artists = {}
+    for i in range(n_artists):
+        artist_id = _fake_id(rng)
+        artists[artist_id] = {
+            "id": artist_id,
+            "name": f"Artist {i}",
+            "genres": rng.sample(["k-pop", "k-rap", "pop", "hip hop", "r&b", "dance"], 2),
+            "followers": {"href": None, "total": rng.randint(100, 50_000_000)},
+            "popularity": rng.randint(0, 100),
+        }
+
+    artist_list = list(artists.values())
+    start = datetime(2020, 1, 1)
+    items = []
+    for i in range(n_tracks):
+        artist = rng.choice(artist_list)
+        added = start + timedelta(minutes=i * 17)
+        items.append({
+            "added_at": added.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "track": {
+                "id": _fake_id(rng),
+                "name": f"Track {i}" + rng.choice(["", " (Remix)", " - Japanese ver.", " - Instrumental"]),
+                "popularity": rng.randint(0, 100),
+                "duration_ms": rng.randint(90_000, 420_000),
+                "album": {"name": f"Album {i // 12}"},
+                "artists": [{"id": artist["id"], "name": artist["name"]}],
+            },
+        })
+
+    return {
+        "playlists": {playlist_id: {"name": "Fake Playlist", "snapshot_id": "snap-1", "items": items}},
+        "artists": artists,
+    }
+
+
+# RECORDED DATA
+def dataset_from_landing(runs: List[Tuple[str, Optional[str]]],
+                         base_dir: Optional[str] = None,
+                         artist_cache_path: Optional[str] = None) -> Dict[str, Any]:
+    """Build a dataset from landed runs, given as (playlist_id, run_id or None for the latest).
+
+    Artist details come from the ETL's artist cache regardless of age; artists it
+    does not hold are served with their landed name and no genres, followers or
+    popularity. Runs landed with a narrow LANDING_ITEM_FIELDS are served as landed.
+    """
+    # Imported here so `serve` with synthetic data doesn't load the ETL's config
+    from .artist_cache import ArtistCache
+    from .config import ARTIST_CACHE_PATH, LANDING_DIR
+    from .landing import iter_landed_items, latest_run_id, read_meta
+
+    base_dir = base_dir or LANDING_DIR
+    playlists = {}
+    landed_artists = {}
+    for playlist_id, run_id in runs:
+        run_id = run_id or latest_run_id(playlist_id, base_dir)
+        if not run_id:
+            raise FileNotFoundError(f"No landed runs for playlist {playlist_id} in {base_dir}")
+        meta = read_meta(playlist_id, run_id, base_dir)
+        items = list(iter_landed_items(playlist_id, run_id, base_dir))
+        playlists[playlist_id] = {
+            "name": meta["playlist_name"],
+            "snapshot_id": meta.get("snapshot_id") or f"landed-{run_id}",
+            "items": items,
+        }
+        for item in items:
+            for artist in (item.get("track") or {}).get("artists") or []:
+                if artist.get("id"):
+                    landed_artists.setdefault(artist["id"], artist.get("name"))
+
+    cache = ArtistCache(artist_cache_path or ARTIST_CACHE_PATH, ttl=float("inf"))
+    try:
+        cached = cache.get_many(list(landed_artists))
+    finally:
+        cache.close()
+
+    artists = {}
+    for artist_id, name in landed_artists.items():
+        details = cached.get(artist_id, {})
+        artists[artist_id] = {
+            "id": artist_id,
+            "name": name,
+            "genres": details.get("genres", []),
+            "followers": {"href": None, "total": details.get("followers", {}).get("total")},
+            "popularity": details.get("popularity"),
+        }
+    return {"playlists": playlists, "artists": artists}
+
+
+def _parse_landed(value: str) -> Tuple[str, Optional[str]]:
+    playlist_id, _, run_id = value.partition(":")
+    return playlist_id, run_id or None
+
+
+# SERVER
+class FakeSpotifyState:
+    """Dataset plus behavior knobs shared by all request handler threads."""
+
+    def __init__(self,
+                 dataset: Dict[str, Any],
+                 latency: float = 0.0,
+                 max_page_size: int = 100,
+                 error_rate: float = 0.0,
+                 retry_after: Optional[float] = None,
+                 token_ttl: int = 3600,
+                 seed: int = 0):
+        self.dataset = dataset
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.tokens_issued = 0
+        self.valid_tokens = set()
+
+    def issue_token(self) -> str:
+        with self.lock:
+            self.tokens_issued += 1
+            token = f"fake-{self.tokens_issued}"
+            self.valid_tokens.add(token)
+            return token
+
+    def token_is_valid(self, token: str) -> bool:
+        with self.lock:
+            return token in self.valid_tokens
+
+    def expire_tokens(self):
+        """Revoke every issued token, so the next API call gets a 401."""
+        with self.lock:
+            self.valid_tokens.clear()
+
+    def should_throttle(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.throttled += 1
+                return True
+            return False
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    state: FakeSpotifyState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate(self) -> bool:
+        """Apply latency and 429 injection; returns False if the request was throttled."""
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.should_throttle():
+            headers = {}
+            if self.state.retry_after is not None:
+                headers["Retry-After"] = str(self.state.retry_after)
+            self._send_json(429, {"error": {"status": 429, "message": "API rate limit exceeded"}}, headers)
+            return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlparse(self.path).path != "/api/token":
+            self._send_json(404, {"error": "not found"})
+            return
+        if not self._simulate():
+            return
+        self._send_json(200, {
+            "access_token": self.state.issue_token(),
+            "token_type": "Bearer",
+            "expires_in": self.state.token_ttl,
+        })
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path
+
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            self._send_json(401, {"error": {"status": 401, "message": "No token provided"}})
+            return
+        if not self.state.token_is_valid(auth[len("Bearer "):]):
+            self._send_json(401, {"error": {"status": 401, "message": "The access token expired"}})
+            return
+        if not self._simulate():
+            return
+
+        data = self.state.dataset
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)/tracks", path)
+        if match:
+            playlist = data["playlists"].get(match.group(1))
+            if playlist is None:
+                self._send_json(404, {"error": {"status": 404, "message": "Not found"}})
+                return
+            offset = int(query.get("offset", 0))
+            limit = min(int(query.get("limit", 100)), self.state.max_page_size)
+            items = playlist["items"]
+            self._send_json(200, {
+                "items": items[offset:offset + limit],
+                "limit": limit,
+                "offset": offset,
+                "total": len(items),
+            })
+            return
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)", path)
+        if match:
+            playlist = data["playlists"].get(match.group(1))
+            if playlist is None:
+                self._send_json(404, {"error": {"status": 404, "message": "Not found"}})
+                return
+            self._send_json(200, {
+                "id": match.group(1),
+                "name": playlist["name"],
+                "snapshot_id": playlist["snapshot_id"],
+            })
+            return
+
+        if path == "/v1/artists":
+            ids = [a for a in query.get("ids", "").split(",") if a]
+            self._send_json(200, {"artists": [data["artists"].get(a) for a in ids[:50]]})
+            return
+
+        match = re.fullmatch(r"/v1/artists/([^/]+)", path)
+        if match:
+            artist = data["artists"].get(match.group(1))
+            if artist is None:
+                self._send_json(404, {"error": {"status": 404, "message": "Not found"}})
+                return
+            self._send_json(200, artist)
+            return
+
+        if path == "/v1/search":
+            q = query.get("q", "").lower()
+            limit = int(query.get("limit", 20))
+            hits = [
+                {"id": pid, "name": p["name"], "snapshot_id": p["snapshot_id"]}
+                for pid, p in data["playlists"].items()
+                if q in p["name"].lower() or q in pid.lower()
+            ]
+            self._send_json(200, {"playlists": {"items": hits[:limit], "total": len(hits)}})
+            return
+
+        self._send_json(404, {"error": {"status": 404, "message": "Not found"}})
+
+
+def start_server(state: FakeSpotifyState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake API on a background thread; port 0 picks a free port."""
+    handler = type("BoundFakeSpotifyHandler", (FakeSpotifyHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_urls(server: ThreadingHTTPServer) -> Dict[str, str]:
+    host, port = server.server_address[:2]
+    return {
+        "token_url": f"http://{host}:{port}/api/token",
+        "api_base": f"http://{host}:{port}/v1",
+    }
+
+
+# BENCHMARK
+def benchmark_extract(state: FakeSpotifyState, rate: float, concurrency: int) -> List[Dict[str, Any]]:
+    """Time sequential and concurrent playlist extraction against a local server."""
+    # Imported here so `serve` doesn't load the ETL's client
+    from .spotify_client import SpotifyClient
+    from .rate_limiter import RateLimiter
+
+    server = start_server(state)
+    urls = server_urls(server)
+    playlist_id = next(iter(state.dataset["playlists"]))
+    results = []
+
+    try:
+        for concurrent in (False, True):
+            # The fake server accepts any credentials; none are needed in the environment
+            client = SpotifyClient(rate_limiter=RateLimiter(
+                rate=rate, burst=concurrency,
+                start_concurrency=concurrency, max_concurrency=concurrency,
+            ), client_id="fake-client", client_secret="fake-secret")
+            client.token_url = urls["token_url"]
+            client.api_base = urls["api_base"]
+            client.tokens.cache_path = None
+
+            requests_before, throttled_before = state.requests, state.throttled
+            start = time.perf_counter()
+            items = client.get_playlist_tracks(playlist_id, concurrent=concurrent, max_workers=concurrency)
+            elapsed = time.perf_counter() - start
+            client.close()
+
+            results.append({
+                "mode": "concurrent" if concurrent else "sequential",
+                "items": len(items),
+                "seconds": elapsed,
+                "items_per_sec": len(items) / elapsed if elapsed else float("inf"),
+                "requests": state.requests - requests_before,
+                "throttled": state.throttled - throttled_before,
+            })
+    finally:
+        server.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Spotify API stand-in")
+    parser.add_argument("command", choices=["serve", "bench", "record"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tracks", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=200)
+    parser.add_argument("--data", help="Recorded dataset JSON ({'playlists': ..., 'artists': ...})")
+    parser.add_argument("--landed", action="append", type=_parse_landed, metavar="PLAYLIST_ID[:RUN_ID]",
+                        help="Use a landed run (default: the latest) as data; repeatable")
+    parser.add_argument("--out", help="record: file the dataset JSON is written to")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--page-size", type=int, default=100, help="Max items per playlist page")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After header sent with injected 429s")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Client token-bucket rate for bench")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client concurrency for bench")
+    args = parser.parse_args()
+
+    if args.command == "record" and not (args.landed and args.out):
+        parser.error("record needs --landed and --out")
+
+    if args.landed:
+        dataset = dataset_from_landing(args.landed)
+    elif args.data:
+        with open(args.data, encoding="utf-8") as f:
+            dataset = json.load(f)
+    else:
+        dataset = generate_dataset(args.tracks, args.artists)
+
+    if args.command == "record":
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(dataset, f)
+        n_items = sum(len(p["items"]) for p in dataset["playlists"].values())
+        print(f"Wrote {len(dataset['playlists'])} playlists ({n_items} items) "
+              f"and {len(dataset['artists'])} artists to {args.out}")
+        return
+
+    state = FakeSpotifyState(
+        dataset,
+        latency=args.latency,
+        max_page_size=args.page_size,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+    )
+
+    if args.command == "serve":
+        server = start_server(state, port=args.port)
+        urls = server_urls(server)
+        print(f"Fake Spotify API listening on {urls['api_base']} (token: {urls['token_url']})")
+        print(f"Playlists: {', '.join(dataset['playlists'])}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    for r in benchmark_extract(state, args.rate, args.concurrency):
+        print(
+            f"{r['mode']:<11} {r['items']:>7} items  {r['seconds']:7.2f}s  "
+            f"{r['items_per_sec']:9.0f} items/s  {r['requests']:>5} requests  {r['throttled']:>4} throttled"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# etl/landing.py
+#
+# Raw landing zone: every playlist page received from the API is persisted as
+# compressed NDJSON (one item per line), partitioned by playlist and run:
+#
+#   <LANDING_DIR>/playlist_id=<id>/run=<run_id>/part-00000.ndjson.zst|.gz
+#   <LANDING_DIR>/playlist_id=<id>/run=<run_id>/_meta.json
+#
+# Replaying a run re-feeds the landed items to transform without touching the API.
+# Pages are landed with LANDING_ITEM_FIELDS (whole items by default), recorded in
+# _meta.json as "fields" so a replay can tell whether they cover what transform reads.
+
+import gzip
+import json
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from .config import LANDING_DIR, LANDING_ITEM_FIELDS
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; gzip is always available
+    zstandard = None
+
+
+RUN_ID_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime(RUN_ID_FORMAT)
+
+
+def run_id_date(run_id: str) -> date:
+    """UTC date a run was landed on, from its run id."""
+    return datetime.strptime(run_id, RUN_ID_FORMAT).date()
+
+
+def _open_write(path_stem: Path):
+    if zstandard is not None:
+        path = path_stem.with_name(path_stem.name + ".ndjson.zst")
+        return zstandard.open(path, "wt", encoding="utf-8")
+    path = path_stem.with_name(path_stem.name + ".ndjson.gz")
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def _open_read(path: Path):
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+        return zstandard.open(path, "rt", encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """Spotify's `fields=` syntax as a tree, e.g. "items(track(id))" -> {"items": {"track": {"id": {}}}}.
+
+    An empty dict means the whole value is kept.
+    """
+    tree: Dict[str, Any] = {}
+    stack = [tree]
+    name = ""
+    for ch in fields + ",":
+        if ch in ",()":
+            if name.strip():
+                stack[-1][name.strip()] = {}
+            if ch == "(":
+                stack.append(stack[-1][name.strip()])
+            elif ch == ")":
+                stack.pop()
+            name = ""
+        else:
+            name += ch
+    return tree
+
+
+def missing_fields(landed: Optional[str], required: str) -> List[str]:
+    """Dotted paths in the `required` projection that a `landed` one drops.
+
+    landed=None means the pages were landed unprojected, so nothing is missing.
+    """
+    if landed is None:
+        return []
+
+    def walk(have, want, prefix):
+        missing = []
+        for key, sub in want.items():
+            path = prefix + key
+            if key not in have:
+                missing.append(path)
+            elif have[key]:
+                # An empty `want` subtree asks for the whole value, which a projection never covers
+                missing.extend(walk(have[key], sub, path + ".") if sub else [path])
+        return missing
+
+    return walk(_parse_fields(landed), _parse_fields(required), "")
+
+
+def run_dir(playlist_id: str, run_id: str, base_dir: str = LANDING_DIR) -> Path:
+    return Path(base_dir) / f"playlist_id={playlist_id}" / f"run={run_id}"
+
+
+class LandingWriter:
+    """Persists raw playlist pages for one (playlist, run) as they stream through."""
+
+    def __init__(self,
+                 playlist_id: str,
+                 playlist_name: str,
+                 run_id: Optional[str] = None,
+                 base_dir: str = LANDING_DIR,
+                 fields: Optional[str] = LANDING_ITEM_FIELDS):
+        self.playlist_id = playlist_id
+        self.playlist_name = playlist_name
+        # Projection the pages must be fetched with (None: whole items)
+        self.fields = fields
+        self.run_id = run_id or new_run_id()
+        self.dir = run_dir(playlist_id, self.run_id, base_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.pages = 0
+        self.items = 0
+
+    def write_page(self, page: Dict[str, Any]):
+        with _open_write(self.dir / f"part-{self.pages:05d}") as f:
+            for item in page.get("items", []):
+                f.write(json.dumps(item, separators=(",", ":")))
+                f.write("\n")
+                self.items += 1
+        self.pages += 1
+
+    def tee_pages(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Write each page to the landing zone, then pass it through unchanged."""
+        for page in pages:
+            self.write_page(page)
+            yield page
+
+    def finish(self, **extra):
+        """Mark the run complete; replay refuses runs without this marker."""
+        meta = {
+            "playlist_id": self.playlist_id,
+            "playlist_name": self.playlist_name,
+            "run_id": self.run_id,
+            "fields": self.fields,
+            "pages": self.pages,
+            "items": self.items,
+            **extra,
+        }
+        (self.dir / "_meta.json").write_text(json.dumps(meta, indent=2))
+
+
+def latest_run_id(playlist_id: str, base_dir: str = LANDING_DIR) -> Optional[str]:
+    """Most recent completed run for a playlist, or None."""
+    root = Path(base_dir) / f"playlist_id={playlist_id}"
+    runs = sorted(
+        p.name.split("=", 1)[1]
+        for p in root.glob("run=*")
+        if (p / "_meta.json").exists()
+    )
+    return runs[-1] if runs else None
+
+
+def read_meta(playlist_id: str, run_id: str, base_dir: str = LANDING_DIR) -> Dict[str, Any]:
+    meta_path = run_dir(playlist_id, run_id, base_dir) / "_meta.json"
+    if not meta_path.exists():
+        raise FileNotFoundError(f"No completed landing run at {meta_path.parent}")
+    return json.loads(meta_path.read_text())
+
+
+def iter_landed_items(playlist_id: str, run_id: str,
+                      base_dir: str = LANDING_DIR) -> Iterator[Dict[str, Any]]:
+    """Yield landed items in their original page order."""
+    read_meta(playlist_id, run_id, base_dir)
+    for part in sorted(run_dir(playlist_id, run_id, base_dir).glob("part-*.ndjson.*")):
+        with _open_read(part) as f:
+            for line in f:
+                yield json.loads(line)
@@ -1,56 +1,275 @@
 # etl/load.py
 
 import os
+import tempfile
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, MetaData, Table
+from sqlalchemy import text, bindparam
 from sqlalchemy.dialects.mysql import insert
-from sqlalchemy.exc import SQLAlchemyError
-from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError, DBAPIError
+from .config import TRANSFORM_CHUNK_SIZE
+from .db import get_engine, get_infile_engine, get_table
 
-load_dotenv()
+# Rows per multi-row INSERT ... ON DUPLICATE KEY UPDATE statement
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "1000"))
 
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_HOST = os.getenv("MYSQL_HOST")
-MYSQL_PORT = os.getenv("MYSQL_PORT")
-MYSQL_DB = os.getenv("MYSQL_DB")
+# "batch" (multi-row upserts), "infile" (LOAD DATA LOCAL INFILE into a staging
+# table) or "auto" (infile once a frame has at least LOAD_INFILE_MIN_ROWS
+# changed rows). run_etl loads TRANSFORM_CHUNK_SIZE rows at a time, so the
+# default is tied to it: bulk path for chunks where most rows changed (first
+# loads, full refreshes), batched upserts for small incremental deltas.
+LOAD_MODE = os.getenv("LOAD_MODE", "auto")
+LOAD_INFILE_MIN_ROWS = int(os.getenv("LOAD_INFILE_MIN_ROWS", str(TRANSFORM_CHUNK_SIZE // 2)))
 
-engine = create_engine(
-    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}",
-    future=True,
-)
+# Written on insert but never overwritten: a track in several playlists would
+# otherwise flip between them on every load (membership is in playlist_tracks)
+INSERT_ONLY_COLUMNS = {"playlist_id", "playlist_name"}
 
+# MySQL error codes meaning LOCAL INFILE is disabled on the client or server
+LOCAL_INFILE_DISABLED = {1148, 2068, 3948}
 
-def _get_table(table_name: str) -> Table:
-    metadata = MetaData()
-    metadata.reflect(bind=engine, only=[table_name])
-    return metadata.tables[table_name]
 
+def _to_records(df: pd.DataFrame):
+    """Plain Python rows for the DB driver: categoricals as values, NA/NaT as None."""
+    plain = df.astype(object)
+    return plain.where(plain.notna(), None).to_dict("records")
 
-def upsert_df(df: pd.DataFrame, table_name: str, pk: str):
+
+def upsert_df(df: pd.DataFrame, table_name: str, pk: str,
+              batch_size: int = LOAD_BATCH_SIZE):
+    """Upsert df in batches of multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+
+    The update clause references VALUES(col), so one statement is compiled
+    once and executed with a whole batch of rows per round trip.
+    """
     if df.empty:
         print(f"No data for table {table_name}. Skipping.")
         return
 
-    table = _get_table(table_name)
+    table = get_table(table_name)
 
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            row_dict = row.to_dict()
+    stmt = insert(table)
+    stmt = stmt.on_duplicate_key_update(
+        **{col: stmt.inserted[col] for col in df.columns
+           if col != pk and col not in INSERT_ONLY_COLUMNS}
+    )
 
-            stmt = insert(table).values(**row_dict)
-            update_dict = {col: row_dict[col] for col in row_dict if col != pk}
-            stmt = stmt.on_duplicate_key_update(**update_dict)
+    records = _to_records(df)
 
-            conn.execute(stmt)
+    with get_engine().begin() as conn:
+        for start in range(0, len(records), batch_size):
+            conn.execute(stmt, records[start:start + batch_size])
 
     print(f"Loaded {len(df)} rows into {table_name}")
 
 
-def load_to_mysql(tracks_df, artists_df):
+def _write_infile_csv(df: pd.DataFrame, path: str):
+    """Write df in the format LOAD DATA expects: \\N for NULL, backslashes escaped."""
+    out = df.copy()
+    for col in out.columns:
+        s = out[col]
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+            continue
+        s = s.astype(object)
+        present = s.notna()
+        s[present] = s[present].astype(str).str.replace("\\", "\\\\", regex=False)
+        out[col] = s
+
+    out.to_csv(
+        path,
+        index=False,
+        header=False,
+        na_rep="\\N",
+        lineterminator="\n",
+        date_format="%Y-%m-%d %H:%M:%S",
+        chunksize=LOAD_BATCH_SIZE * 10,
+        encoding="utf-8",
+    )
+
+
+def infile_upsert_df(df: pd.DataFrame, table_name: str, pk: str) -> bool:
+    """Bulk upsert via a temporary CSV, LOAD DATA LOCAL INFILE into a session
+    staging table, and one set-based INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+
+    Falls back to upsert_df when LOCAL INFILE is disabled; returns False then.
+    """
+    if df.empty:
+        print(f"No data for table {table_name}. Skipping.")
+        return True
+
+    staging = f"stg_{table_name}"
+    cols = ", ".join(f"`{c}`" for c in df.columns)
+    updates = ", ".join(
+        f"`{c}` = VALUES(`{c}`)" for c in df.columns if c != pk and c not in INSERT_ONLY_COLUMNS
+    )
+
+    fd, path = tempfile.mkstemp(suffix=".csv", prefix=f"{table_name}_")
+    os.close(fd)
+    try:
+        _write_infile_csv(df, path)
+
+        with get_infile_engine().begin() as conn:
+            conn.execute(text(f"DROP TEMPORARY TABLE IF EXISTS {staging}"))
+            conn.execute(text(f"CREATE TEMPORARY TABLE {staging} LIKE {table_name}"))
+            conn.execute(
+                text(
+                    f"LOAD DATA LOCAL INFILE :path INTO TABLE {staging} "
+                    "CHARACTER SET utf8mb4 "
+                    "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+                    "LINES TERMINATED BY '\\n' "
+                    f"({cols})"
+                ),
+                {"path": path},
+            )
+            conn.execute(text(
+                f"INSERT INTO {table_name} ({cols}) "
+                f"SELECT {cols} FROM {staging} "
+                f"ON DUPLICATE KEY UPDATE {updates}"
+            ))
+            conn.execute(text(f"DROP TEMPORARY TABLE {staging}"))
+
+    except DBAPIError as e:
+        code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+        if code not in LOCAL_INFILE_DISABLED:
+            raise
+        print(f"LOCAL INFILE unavailable ({code}); falling back to batched upserts.")
+        upsert_df(df, table_name, pk)
+        return False
+    finally:
+        os.remove(path)
+
+    print(f"Bulk loaded {len(df)} rows into {table_name}")
+    return True
+
+
+# CHANGE DETECTION
+def split_by_hash(df: pd.DataFrame, pk: str, stored: dict):
+    """Split df against {pk: stored row_hash}; returns (rows to upsert, counts).
+
+    Rows whose key is new are inserts, rows whose hash differs (or was never
+    set) are updates, and everything else is left untouched.
+    """
+    keys = df[pk].astype(object).tolist()
+    hashes = df["row_hash"].tolist()
+    is_new = np.fromiter((k not in stored for k in keys), bool, len(keys))
+    unchanged = np.fromiter((stored.get(k) == h for k, h in zip(keys, hashes)), bool, len(keys))
+
+    counts = {"inserted": int(is_new.sum()), "unchanged": int(unchanged.sum())}
+    counts["updated"] = len(df) - counts["inserted"] - counts["unchanged"]
+    return df[~unchanged], counts
+
+
+def split_changed(df: pd.DataFrame, table_name: str, pk: str):
+    """Compare df's row_hash with the stored one, fetched for all keys in a single query."""
+    if df.empty:
+        return df, {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    query = text(
+        f"SELECT {pk}, row_hash FROM {table_name} WHERE {pk} IN :keys"
+    ).bindparams(bindparam("keys", expanding=True))
+    with get_engine().connect() as conn:
+        stored = dict(conn.execute(query, {"keys": df[pk].astype(object).tolist()}).all())
+
+    return split_by_hash(df, pk, stored)
+
+
+def _upsert(df: pd.DataFrame, table_name: str, pk: str, mode: str):
+    if "row_hash" in df.columns:
+        df, counts = split_changed(df, table_name, pk)
+    else:
+        counts = {"inserted": None, "updated": None, "unchanged": None}
+
+    if mode == "infile" or (mode == "auto" and len(df) >= LOAD_INFILE_MIN_ROWS):
+        infile_upsert_df(df, table_name, pk)
+    else:
+        upsert_df(df, table_name, pk)
+    return counts
+
+
+def load_to_mysql(tracks_df, artists_df, mode: str = LOAD_MODE):
+    """Load both frames, skipping rows whose fingerprint is unchanged.
+
+    Returns {"artists": counts, "tracks": counts} with inserted/updated/unchanged.
+    """
     print("Loading into MySQL…")
 
-    upsert_df(artists_df, "artists", "artist_id")
-    upsert_df(tracks_df, "tracks", "track_id")
+    counts = {
+        "artists": _upsert(artists_df, "artists", "artist_id", mode),
+        "tracks": _upsert(tracks_df, "tracks", "track_id", mode),
+    }
+    for table_name, c in counts.items():
+        if c["unchanged"] is not None:
+            print(f"  {table_name}: {c['inserted']} inserted, {c['updated']} updated, "
+                  f"{c['unchanged']} unchanged")
 
     print("Load complete!")
+    return counts
+
+
+# PLAYLIST MEMBERSHIP
+def sync_playlist_tracks(playlist_id: str, members: pd.DataFrame,
+                         batch_size: int = LOAD_BATCH_SIZE) -> dict:
+    """Make playlist_tracks match members (track_id, added_at) for one playlist.
+
+    members are bulk-loaded into a session staging table, then three set-based
+    statements add new memberships, refresh changed added_at values, and drop
+    removed tracks with a single anti-join.
+    """
+    records = _to_records(members[["track_id", "added_at"]])
+    params = {"pid": playlist_id}
+
+    with get_engine().begin() as conn:
+        conn.execute(text("DROP TEMPORARY TABLE IF EXISTS stg_playlist_tracks"))
+        conn.execute(text(
+            "CREATE TEMPORARY TABLE stg_playlist_tracks ("
+            "track_id VARCHAR(50) PRIMARY KEY, added_at DATETIME)"
+        ))
+        insert_stg = text("INSERT INTO stg_playlist_tracks (track_id, added_at) VALUES (:track_id, :added_at)")
+        for start in range(0, len(records), batch_size):
+            conn.execute(insert_stg, records[start:start + batch_size])
+
+        added = conn.execute(text(
+            "INSERT INTO playlist_tracks (playlist_id, track_id, added_at) "
+            "SELECT :pid, s.track_id, s.added_at FROM stg_playlist_tracks s "
+            "LEFT JOIN playlist_tracks pt ON pt.playlist_id = :pid AND pt.track_id = s.track_id "
+            "WHERE pt.track_id IS NULL"
+        ), params).rowcount
+        updated = conn.execute(text(
+            "UPDATE playlist_tracks pt JOIN stg_playlist_tracks s ON s.track_id = pt.track_id "
+            "SET pt.added_at = s.added_at "
+            "WHERE pt.playlist_id = :pid AND NOT (pt.added_at <=> s.added_at)"
+        ), params).rowcount
+        removed = conn.execute(text(
+            "DELETE pt FROM playlist_tracks pt "
+            "LEFT JOIN stg_playlist_tracks s ON s.track_id = pt.track_id "
+            "WHERE pt.playlist_id = :pid AND s.track_id IS NULL"
+        ), params).rowcount
+
+        conn.execute(text("DROP TEMPORARY TABLE stg_playlist_tracks"))
+
+    return {"added": added, "updated": updated, "removed": removed,
+            "unchanged": len(records) - added - updated}
+
+
+# INCREMENTAL STATE
+def get_playlist_state(playlist_id: str):
+    """Return (snapshot_id, last_added_at) stored for a playlist, or (None, None)."""
+    with get_engine().connect() as conn:
+        row = conn.execute(
+            text("SELECT snapshot_id, last_added_at FROM etl_state WHERE playlist_id = :pid"),
+            {"pid": playlist_id},
+        ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def save_playlist_state(playlist_id: str, snapshot_id: str, last_added_at: str):
+    with get_engine().begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO etl_state (playlist_id, snapshot_id, last_added_at) "
+                "VALUES (:pid, :snap, :added) "
+                "ON DUPLICATE KEY UPDATE snapshot_id = VALUES(snapshot_id), "
+                "last_added_at = VALUES(last_added_at)"
+            ),
+            {"pid": playlist_id, "snap": snapshot_id, "added": last_added_at},
+        )
@@ -0,0 +1,186 @@
+# etl/migrate.py
+#
+# Versioned schema migrations for the MySQL database. schema.sql is the
+# baseline; every file in migrations/ named NNNN_description.sql is applied
+# once, in order, and recorded in the schema_migrations table.
+#
+#   python -m etl.migrate              apply pending migrations
+#   python -m etl.migrate --status     list applied and pending migrations
+#   python -m etl.migrate --dry-run    print pending statements without running them
+#
+# MySQL has no ADD COLUMN/ADD INDEX IF NOT EXISTS, so a statement can be preceded
+# by one or more guard comments; it is skipped when all of them already hold:
+#
+#   -- skip-if: column tracks.base_name                  the column exists
+#   -- skip-if: index tracks.idx_tracks_base_name        the index exists
+#   -- skip-if: column_type tracks.added_at datetime     the column has that COLUMN_TYPE
+#
+# Guarded (or naturally idempotent) steps make a migration safe to re-run after
+# it failed halfway.
+
+import argparse
+import re
+from pathlib import Path
+from typing import List, Tuple
+from sqlalchemy import text
+from .db import get_engine, clear_metadata
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+MIGRATION_FILE = re.compile(r"(\d{4})_(\w+)\.sql")
+
+
+def discover(migrations_dir: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    """(version, name, path) for every migration file, sorted by version."""
+    found = []
+    for path in migrations_dir.glob("*.sql"):
+        match = MIGRATION_FILE.fullmatch(path.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2), path))
+    return sorted(found)
+
+
+GUARD_PREFIX = "-- skip-if:"
+
+# information_schema checks behind each guard kind, scoped to the current database
+GUARD_QUERIES = {
+    "column": (
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :name"
+    ),
+    "index": (
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :name"
+    ),
+    "column_type": (
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :name "
+        "AND COLUMN_TYPE = :type"
+    ),
+}
+
+Guard = Tuple[str, str, str, str]   # (kind, table, name, column type or "")
+
+
+def _parse_guard(line: str) -> Guard:
+    kind, target, *column_type = line[len(GUARD_PREFIX):].split(maxsplit=2)
+    table, name = target.split(".")
+    if kind not in GUARD_QUERIES or (kind == "column_type") != bool(column_type):
+        raise ValueError(f"Bad migration guard: {line.strip()!r}")
+    return kind, table, name, column_type[0] if column_type else ""
+
+
+def parse_migration(sql: str) -> List[Tuple[List[Guard], str]]:
+    """Split a migration file into (guards, statement) pairs; other `--` comment lines are dropped."""
+    # Drop plain comments first: they may contain ";"
+    kept = [
+        line for line in sql.splitlines()
+        if not line.lstrip().startswith("--") or line.lstrip().startswith(GUARD_PREFIX)
+    ]
+    parsed = []
+    for chunk in "\n".join(kept).split(";"):
+        guards, lines = [], []
+        for line in chunk.splitlines():
+            if line.lstrip().startswith(GUARD_PREFIX):
+                guards.append(_parse_guard(line.lstrip()))
+            else:
+                lines.append(line)
+        stmt = "\n".join(lines).strip()
+        if stmt:
+            parsed.append((guards, stmt))
+        elif guards:
+            raise ValueError(f"Migration guard without a statement: {guards}")
+    return parsed
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a migration file into statements, without their guards."""
+    return [stmt for _, stmt in parse_migration(sql)]
+
+
+def _guards_hold(conn, guards: List[Guard]) -> bool:
+    return all(
+        conn.execute(text(GUARD_QUERIES[kind]), {"table": table, "name": name, "type": column_type}).scalar()
+        for kind, table, name, column_type in guards
+    )
+
+
+def _ensure_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INT PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(engine=None) -> set:
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def pending(engine=None, migrations_dir: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    done = applied_versions(engine)
+    return [m for m in discover(migrations_dir) if m[0] not in done]
+
+
+def migrate(engine=None, migrations_dir: Path = MIGRATIONS_DIR, dry_run: bool = False) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied.
+
+    MySQL commits DDL implicitly, so a migration that fails halfway is not
+    rolled back: it stays unrecorded and the error is raised. Steps it already
+    completed are skipped by their guards when it is re-run.
+    """
+    engine = engine or get_engine()
+    applied = []
+
+    for version, name, path in pending(engine, migrations_dir):
+        statements = parse_migration(path.read_text(encoding="utf-8"))
+        print(f"Migration {version:04d}_{name}: {len(statements)} statements")
+
+        if dry_run:
+            for guards, stmt in statements:
+                for kind, table, target, column_type in guards:
+                    print(f"{GUARD_PREFIX} {kind} {table}.{target} {column_type}".rstrip())
+                print(f"{stmt};\n")
+            continue
+
+        with engine.begin() as conn:
+            for guards, stmt in statements:
+                if guards and _guards_hold(conn, guards):
+                    print(f"  already applied: {' '.join(stmt.split())[:80]}")
+                    continue
+                conn.execute(text(stmt))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                {"v": version, "n": name},
+            )
+        applied.append(version)
+
+    if applied:
+        # Reflected tables cached by etl.db describe the old schema
+        clear_metadata()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="Print pending statements only")
+    args = parser.parse_args()
+
+    if args.status:
+        done = applied_versions()
+        for version, name, _ in discover():
+            print(f"{'applied' if version in done else 'pending':<8} {version:04d}_{name}")
+        return
+
+    applied = migrate(dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# etl/pipeline.py
+#
+# Pipelined execution of ETL stages. The source (extract) and each transform
+# stage run on their own thread, joined by bounded queues; the caller consumes
+# the last stage's output (load) on its own thread. A full queue blocks its
+# producer, so memory stays bounded by queue_size per link, and wall time
+# approaches the slowest stage instead of the sum of all of them.
+#
+#   chunks = run_pipelined(raw_items, [("transform", transform_stage)], stats=stats)
+#   for tracks_df, artists_df in chunks:
+#       backend.load(tracks_df, artists_df)
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .config import PIPELINE_QUEUE_SIZE, PIPELINE_SOURCE_BATCH
+
+Stage = Tuple[str, Callable[[Iterator[Any]], Iterator[Any]]]
+
+_DONE = object()
+_POLL = 0.1     # Seconds between checks for a cancelled pipeline while blocked
+
+
+class _Failure:
+    """Carries a stage's exception downstream to the consumer."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class _Pipeline:
+    def __init__(self, queue_size: int, stats: Dict[str, float]):
+        self.queue_size = queue_size
+        self.stats = stats
+        self.cancelled = threading.Event()
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+
+    def _charge(self, name: str, seconds: float):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0.0) + seconds
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is cancelled."""
+        while not self.cancelled.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, q: queue.Queue, name: Optional[str], batched: bool) -> Iterator[Any]:
+        """Yield items from q until the end marker; time spent waiting is not charged to `name`."""
+        while True:
+            start = time.perf_counter()
+            try:
+                item = q.get(timeout=_POLL)
+            except queue.Empty:
+                if self.cancelled.is_set():
+                    return
+                continue
+            finally:
+                if name:
+                    self._charge(name, -(time.perf_counter() - start))
+
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            if batched:
+                yield from item
+            else:
+                yield item
+
+    def _run(self, name: str, items: Iterator[Any], out: queue.Queue, batch: int):
+        """Thread body: pull from items, push (optionally batched) results to out."""
+        pending = []
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    self._charge(name, time.perf_counter() - start)
+
+                if batch > 1:
+                    pending.append(item)
+                    if len(pending) < batch:
+                        continue
+                    item, pending = pending, []
+                if not self._put(out, item):
+                    return
+            if pending and not self._put(out, pending):
+                return
+            self._put(out, _DONE)
+        except BaseException as e:
+            self._put(out, _Failure(e))
+
+    def start(self, name: str, items: Iterator[Any], out: queue.Queue, batch: int = 1):
+        thread = threading.Thread(target=self._run, args=(name, items, out, batch),
+                                  name=f"etl-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def close(self):
+        self.cancelled.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+
+def run_pipelined(source: Iterable[Any],
+                  stages: List[Stage],
+                  queue_size: int = PIPELINE_QUEUE_SIZE,
+                  source_batch: int = PIPELINE_SOURCE_BATCH,
+                  stats: Optional[Dict[str, float]] = None) -> Iterator[Any]:
+    """Run source and stages concurrently; yields the last stage's outputs.
+
+    Each stage is (name, fn) where fn maps an iterator of inputs to an iterator
+    of outputs; it runs entirely on its own thread, so per-thread resources
+    (e.g. SQLite connections) should be opened inside fn. Source items cross
+    their queue in lists of source_batch to keep per-item overhead low.
+
+    stats, if given, receives busy seconds per stage ("extract" for the source),
+    excluding time spent waiting on the previous stage. An exception in any
+    stage is re-raised here; closing the generator early cancels all stages.
+    """
+    stats = {} if stats is None else stats
+    for name in ["extract"] + [name for name, _ in stages]:
+        stats.setdefault(name, 0.0)
+    pipeline = _Pipeline(queue_size, stats)
+
+    link = queue.Queue(maxsize=queue_size)
+    pipeline.start("extract", iter(source), link, batch=source_batch)
+    batched = source_batch > 1
+
+    for name, fn in stages:
+        out = queue.Queue(maxsize=queue_size)
+        pipeline.start(name, iter(fn(pipeline._drain(link, name, batched))), out)
+        link, batched = out, False
+
+    try:
+        yield from pipeline._drain(link, None, batched)
+    finally:
+        pipeline.close()
@@ -0,0 +1,117 @@
+# etl/rate_limiter.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from .config import (
+    RATE_LIMIT_PER_SEC,
+    RATE_LIMIT_MIN,
+    RATE_LIMIT_MAX,
+    RATE_LIMIT_STEP,
+    RATE_LIMIT_BURST,
+    CONCURRENCY_START,
+    CONCURRENCY_MIN,
+    CONCURRENCY_MAX,
+)
+
+
+class RateLimiter:
+    """Token bucket plus an AIMD controller, safe to share across threads.
+
+    Every request takes a token (refilled at `rate` per second up to `burst`)
+    and a concurrency slot. A 429 halves both the rate and the concurrency
+    limit; each run of `limit` consecutive successes adds `rate_step` to the
+    rate and one to the limit, up to `max_rate` and `max_concurrency`.
+    """
+
+    def __init__(self,
+                 rate: float = RATE_LIMIT_PER_SEC,
+                 burst: int = RATE_LIMIT_BURST,
+                 start_concurrency: int = CONCURRENCY_START,
+                 min_concurrency: int = CONCURRENCY_MIN,
+                 max_concurrency: int = CONCURRENCY_MAX,
+                 min_rate: float = RATE_LIMIT_MIN,
+                 max_rate: float = RATE_LIMIT_MAX,
+                 rate_step: float = RATE_LIMIT_STEP):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.rate_step = rate_step
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+        self.limit = start_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+
+        self._cond = threading.Condition()
+
+    # TOKEN BUCKET
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                self._refill()
+                if self.in_flight < self.limit and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                if self.in_flight >= self.limit:
+                    self._cond.wait()
+                else:
+                    self._cond.wait((1 - self.tokens) / self.rate)
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold one token and one concurrency slot for the duration of a request."""
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    # AIMD CONTROLLER
+    def record(self, status_code: int):
+        """Feed a response status back into the rate and concurrency controller."""
+        with self._cond:
+            if status_code == 429:
+                # Settle tokens at the old rate before it changes
+                self._refill()
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.limit = max(self.min_concurrency, self.limit // 2)
+                self._successes = 0
+            elif status_code < 500:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._successes = 0
+                    if self.rate < self.max_rate or self.limit < self.max_concurrency:
+                        self._refill()
+                        self.rate = min(self.max_rate, self.rate + self.rate_step)
+                        self.limit = min(self.max_concurrency, self.limit + 1)
+                        self._cond.notify_all()
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """Process-wide limiter used by every SpotifyClient unless one is passed in."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -1,39 +1,272 @@
 # etl/run_etl.py
 
+import argparse
+import time
+from datetime import date
+import pandas as pd
+from typing import Optional
 from etl.spotify_client import SpotifyClient
-from etl.transform import transform
-from etl.load import load_to_mysql
+from etl.artist_cache import ArtistCache
+from etl.landing import LandingWriter, iter_landed_items, latest_run_id, missing_fields, read_meta, run_id_date
+from etl.transform import (
+    transform_chunks, filter_new_items, tee_membership, membership_frame, PLAYLIST_ITEM_FIELDS,
+)
+from etl.pipeline import run_pipelined
+from etl.storage import StorageBackend, get_backend, BACKENDS
+from etl.snapshots import snapshot_rows, popularity_frames, run_date, SNAPSHOT_ITEM_FIELDS
 from etl.config import DEFAULT_PLAYLIST_ID, DEFAULT_PLAYLIST_NAME
 
-def main():
+
+def _transform_stage(raw_tracks, client):
+    """Chunked transform with its own artist cache (opened on the thread that runs it)."""
+    artist_cache = ArtistCache()
+    try:
+        yield from transform_chunks(
+            raw_tracks,
+            DEFAULT_PLAYLIST_NAME,
+            DEFAULT_PLAYLIST_ID,
+            client,
+            artist_cache,
+        )
+    finally:
+        artist_cache.report()
+        artist_cache.close()
+
+
+def _transform_and_load(raw_tracks, client, backend: StorageBackend,
+                        pipelined: bool = False,
+                        snapshot_date: Optional[date] = None) -> Optional[pd.Timestamp]:
+    """Transform and load in bounded chunks; returns the newest added_at seen.
+
+    Track popularity snapshots are recorded under snapshot_date (default:
+    today). Artists are left to snapshot_popularity, since enrichment may have
+    served them from the artist cache.
+
+    With pipelined, extract, transform and load run concurrently (etl/pipeline.py);
+    loading stays on this thread, which owns the backend's connection.
+    """
+    total_tracks = total_artists = 0
+    load_counts = {}
+    newest = None
+    snapshot_date = snapshot_date or run_date()
+    stats = {}
+    load_time = 0.0
+    started = time.perf_counter()
+
+    if pipelined:
+        chunks = run_pipelined(raw_tracks, [
+            ("transform", lambda items: _transform_stage(items, client)),
+        ], stats=stats)
+    else:
+        chunks = _transform_stage(raw_tracks, client)
+
+    for tracks_df, artists_df in chunks:
+        print(f"- Chunk: {len(tracks_df)} tracks, {len(artists_df)} new artists")
+        load_start = time.perf_counter()
+
+        # 3. Load
+        counts = backend.load(tracks_df, artists_df)
+        for table_name, c in counts.items():
+            totals = load_counts.setdefault(table_name, dict.fromkeys(c, 0))
+            for key, n in c.items():
+                totals[key] += n or 0
+
+        # Popularity history: every processed track, changed or not
+        backend.append_snapshots(snapshot_rows(tracks_df, snapshot_date=snapshot_date))
+        load_time += time.perf_counter() - load_start
+
+        total_tracks += len(tracks_df)
+        total_artists += len(artists_df)
+        chunk_newest = tracks_df["added_at"].max()
+        if pd.notna(chunk_newest) and (newest is None or chunk_newest > newest):
+            newest = chunk_newest
+
+    print(f"Transformed and loaded {total_tracks} tracks, {total_artists} artists.")
+    for table_name, c in load_counts.items():
+        print(f"  {table_name}: {c['inserted']} inserted, {c['updated']} updated, "
+              f"{c['unchanged']} unchanged")
+
+    if pipelined:
+        stats["load"] = load_time
+        busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stats.items())
+        print(f"  Pipelined stages: {busy}; wall {time.perf_counter() - started:.1f}s")
+
+    return newest
+
+
+def _sync_membership(backend: StorageBackend, members: list):
+    """Bring playlist_tracks in line with the playlist's full current track list."""
+    c = backend.sync_playlist_tracks(DEFAULT_PLAYLIST_ID, membership_frame(members))
+    print(f"Playlist membership: {c['added']} added, {c['updated']} updated, "
+          f"{c['removed']} removed, {c['unchanged']} unchanged")
+
+
+def replay(run_id: Optional[str] = None,
+           backend: Optional[StorageBackend] = None,
+           pipelined: bool = False):
+    """Re-run transform and load from a landed run instead of the Spotify API."""
+    backend = backend or get_backend()
+    latest = latest_run_id(DEFAULT_PLAYLIST_ID)
+    run_id = run_id or latest
+    if not run_id:
+        print(f"No landed runs found for playlist {DEFAULT_PLAYLIST_ID}.")
+        return
+
+    meta = read_meta(DEFAULT_PLAYLIST_ID, run_id)
+    print(f"\n Replaying landed run {run_id} ({meta['items']} items, {meta['pages']} pages)")
+    if "fields" not in meta:
+        print(" Warning: run has no recorded projection; fields the transform reads may be missing")
+    else:
+        missing = missing_fields(meta["fields"], PLAYLIST_ITEM_FIELDS)
+        if missing:
+            print(f" Warning: run was landed with fields={meta['fields']!r}, which lacks "
+                  f"{', '.join(missing)}; those columns will be empty")
+
+    # Only artist enrichment needs the API, and the artist cache covers most of it
+    client = SpotifyClient()
+
+    print("\n Transforming and loading in chunks...")
+    members = []
+    raw_tracks = tee_membership(iter_landed_items(DEFAULT_PLAYLIST_ID, run_id), members)
+    # Snapshots belong to the day the pages were landed, not the day of the replay
+    _transform_and_load(raw_tracks, client, backend, pipelined, snapshot_date=run_id_date(run_id))
+    # An older run's track list would undo removals/additions made since then
+    if run_id == latest:
+        _sync_membership(backend, members)
+    else:
+        print(f"Playlist membership: skipped (run {run_id} is older than the latest run {latest})")
+    backend.close()
+
+    print("\n Replay Completed Successfully!")
+
+
+def snapshot_popularity(backend: Optional[StorageBackend] = None):
+    """Append today's popularity for every track in the playlist and its artists.
+
+    The daily history pass, run after the incremental ETL: pages are fetched
+    with a narrow projection and nothing is landed, transformed or upserted.
+    Artists are read from the API (the artist cache is refreshed, not used),
+    so every value is dated the day it was read.
+    """
+    print("\n Recording popularity snapshot...")
+    backend = backend or get_backend()
+
+    client = SpotifyClient()
+    client.authenticate()
+
+    pages = client.iter_pages(DEFAULT_PLAYLIST_ID, concurrent=True, fields=SNAPSHOT_ITEM_FIELDS)
+    raw_items = (item for page in pages for item in page.get("items", []))
+
+    artist_cache = ArtistCache()
+    try:
+        tracks_df, artists_df = popularity_frames(raw_items, client, artist_cache)
+    finally:
+        artist_cache.close()
+
+    n = backend.append_snapshots(snapshot_rows(tracks_df, artists_df, run_date()))
+    print(f"Popularity snapshot: {len(tracks_df)} tracks, {len(artists_df)} artists ({n} rows)")
+    backend.close()
+    client.close()
+
+
+def main(full_refresh: bool = False,
+         backend: Optional[StorageBackend] = None,
+         pipelined: bool = False):
     print("\n Starting Spotify BTS ETL Pipeline...")
+    backend = backend or get_backend()
 
     # 1. Extract
     client = SpotifyClient()
     client.authenticate()
     print("Authenticated with Spotify API.")
 
+    # Incremental check: skip unchanged playlists, only process new items otherwise
+    snapshot_id = client.get_playlist_snapshot_id(DEFAULT_PLAYLIST_ID)
+    last_snapshot, last_added_at = backend.get_playlist_state(DEFAULT_PLAYLIST_ID)
+
+    if full_refresh:
+        last_added_at = None
+    elif snapshot_id == last_snapshot:
+        print(f"\n Playlist {DEFAULT_PLAYLIST_NAME} unchanged (snapshot {snapshot_id}). Nothing to do.")
+        backend.close()
+        return
+
     print(f"\n Fetching playlist: {DEFAULT_PLAYLIST_NAME}")
-    raw_tracks = client.get_playlist_tracks(DEFAULT_PLAYLIST_ID)
-    print(f" Extracted {len(raw_tracks)} tracks.")
+    landing = LandingWriter(DEFAULT_PLAYLIST_ID, DEFAULT_PLAYLIST_NAME)
+    print(f" Landing raw pages in {landing.dir}")
 
-    # 2. Transform (includes artist enrichment)
-    print("\n Transforming data...")
-    tracks_df, artists_df = transform(
-        raw_tracks,
-        DEFAULT_PLAYLIST_NAME,
-        DEFAULT_PLAYLIST_ID,
-        client
-    )
+    # Stream pages through the landing zone so raw payloads never accumulate in memory.
+    # They are fetched with the landing projection, not PLAYLIST_ITEM_FIELDS, so a
+    # later replay is not limited to what today's transform reads.
+    pages = landing.tee_pages(client.iter_pages(
+        DEFAULT_PLAYLIST_ID, concurrent=True, fields=landing.fields
+    ))
+    raw_tracks = (item for page in pages for item in page.get("items", []))
+
+    # Membership is synced from every item, not only the new ones, so removals show up
+    members = []
+    raw_tracks = tee_membership(raw_tracks, members)
+    if last_added_at:
+        print(f" Only processing items added after {last_added_at}")
+        raw_tracks = filter_new_items(raw_tracks, last_added_at)
 
-    print("DataFrames:")
-    print(f"- Tracks: {tracks_df.shape}")
-    print(f"- Artists: {artists_df.shape}")
+    # 2. Transform (includes artist enrichment)
+    print("\n Transforming and loading in chunks...")
+    newest = _transform_and_load(raw_tracks, client, backend, pipelined)
+    landing.finish(snapshot_id=snapshot_id)
+    _sync_membership(backend, members)
 
-    # 3. Load
-    load_to_mysql(tracks_df, artists_df)
+    if newest is not None:
+        newest = newest.strftime("%Y-%m-%dT%H:%M:%S")
+        last_added_at = max(filter(None, [last_added_at, newest]))
+    backend.save_playlist_state(DEFAULT_PLAYLIST_ID, snapshot_id, last_added_at)
+    backend.close()
 
     print("\n ETL Pipeline Completed Successfully!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Spotify BTS ETL pipeline")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignore the stored snapshot/watermark and reprocess the whole playlist",
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Transform and load from the landing zone (default: latest run) instead of the API",
+    )
+    parser.add_argument(
+        "--popularity-snapshot",
+        action="store_true",
+        help="Only append today's track and artist popularity (the daily history pass)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        help="Storage backend (default: STORAGE_BACKEND, else mysql)",
+    )
+    parser.add_argument(
+        "--storage-path",
+        help="Database file for the sqlite/duckdb backends (default: STORAGE_PATH)",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Run extract, transform and load as concurrent stages over bounded queues",
+    )
+    args = parser.parse_args()
+
+    try:
+        backend = get_backend(args.backend, args.storage_path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.popularity_snapshot:
+        snapshot_popularity(backend)
+    elif args.replay:
+        replay(None if args.replay == "latest" else args.replay, backend, pipelined=args.pipelined)
+    else:
+        main(full_refresh=args.full_refresh, backend=backend, pipelined=args.pipelined)
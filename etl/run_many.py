@@ -0,0 +1,206 @@
+# etl/run_many.py
+#
+# Multi-playlist ETL: crawl many playlists concurrently under one SpotifyClient
+# (and so one shared rate limiter), enrich the union of their artists in a
+# single batched pass, and load everything in one consolidated load.
+#
+#   python -m etl.run_many --playlist 4U9cBN9vcM4rmDmgjfTSQH=bts_all_songs --playlist 37i9dQZF1DX...
+#   python -m etl.run_many --config playlists.json
+#
+# playlists.json is a list of playlist ids or {"id": ..., "name": ...} objects
+# (optionally wrapped as {"playlists": [...]}); missing names are fetched.
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from etl.spotify_client import SpotifyClient
+from etl.artist_cache import ArtistCache
+from etl.landing import LandingWriter
+from etl.transform import (
+    normalize_tracks, normalize_artists, enrich_artists, filter_new_items,
+    tee_membership, membership_frame, finalize_frames,
+)
+from etl.snapshots import snapshot_rows, run_date
+from etl.storage import StorageBackend, get_backend, BACKENDS
+from etl.config import PLAYLIST_WORKERS
+
+
+@dataclass
+class PlaylistRun:
+    """One playlist's progress through a multi-playlist run."""
+    playlist_id: str
+    name: Optional[str] = None
+    snapshot_id: Optional[str] = None
+    last_added_at: Optional[str] = None
+    tracks: Optional[pd.DataFrame] = None
+    members: List[tuple] = field(default_factory=list)
+    landing: Optional[LandingWriter] = None
+    error: Optional[str] = None
+
+
+def parse_playlist_spec(spec: str) -> Dict[str, Optional[str]]:
+    """'ID' or 'ID=NAME' from the command line."""
+    playlist_id, _, name = spec.partition("=")
+    return {"id": playlist_id.strip(), "name": name.strip() or None}
+
+
+def load_playlist_config(path: str) -> List[Dict[str, Optional[str]]]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("playlists", [])
+    return [
+        {"id": entry, "name": None} if isinstance(entry, str)
+        else {"id": entry["id"], "name": entry.get("name")}
+        for entry in data
+    ]
+
+
+def _fetch_meta(client: SpotifyClient, playlist_id: str) -> Dict[str, Any]:
+    try:
+        return client.get_playlist_meta(playlist_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _crawl(client: SpotifyClient, run: PlaylistRun) -> PlaylistRun:
+    """Extract and normalize one playlist (no enrichment, no load)."""
+    try:
+        run.landing = LandingWriter(run.playlist_id, run.name)
+        pages = run.landing.tee_pages(client.iter_pages(run.playlist_id, fields=run.landing.fields))
+        items = (item for page in pages for item in page.get("items", []))
+        items = tee_membership(items, run.members)
+        if run.last_added_at:
+            items = filter_new_items(items, run.last_added_at)
+        # normalize_tracks consumes items field by field, so raw payloads are not kept
+        run.tracks = normalize_tracks(items, run.name, run.playlist_id)
+    except Exception as e:
+        run.error = str(e)
+    return run
+
+
+def main(playlists: List[Dict[str, Optional[str]]],
+         full_refresh: bool = False,
+         backend: Optional[StorageBackend] = None,
+         workers: int = PLAYLIST_WORKERS):
+    print(f"\n Starting multi-playlist ETL for {len(playlists)} playlists...")
+    backend = backend or get_backend()
+
+    client = SpotifyClient()
+    client.authenticate()
+    print("Authenticated with Spotify API.")
+
+    runs = {p["id"]: PlaylistRun(p["id"], p["name"]) for p in playlists}
+
+    # 1. Metadata (names, snapshot ids) concurrently; state lookups stay on this thread
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        metas = dict(zip(runs, pool.map(lambda pid: _fetch_meta(client, pid), runs)))
+
+    todo, failed, unchanged = [], [], []
+    for playlist_id, run in runs.items():
+        if "error" in metas[playlist_id]:
+            run.error = metas[playlist_id]["error"]
+            failed.append(run)
+            continue
+        run.name = run.name or metas[playlist_id].get("name") or playlist_id
+        run.snapshot_id = metas[playlist_id].get("snapshot_id")
+        last_snapshot, run.last_added_at = backend.get_playlist_state(playlist_id)
+        if full_refresh:
+            run.last_added_at = None
+        elif run.snapshot_id == last_snapshot:
+            print(f" - {run.name}: unchanged (snapshot {run.snapshot_id})")
+            unchanged.append(run)
+            continue
+        todo.append(run)
+
+    if not todo:
+        for run in failed:
+            print(f" - {run.playlist_id}: FAILED ({run.error})")
+        print("\n Nothing to do.")
+        backend.close()
+        return
+
+    # 2. Extract + normalize, one playlist per worker; pages within a playlist are
+    #    fetched in order, and the shared limiter bounds the total request rate
+    print(f"\n Crawling {len(todo)} playlists ({workers} at a time)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        done = list(pool.map(lambda run: _crawl(client, run), todo))
+
+    failed += [run for run in done if run.error]
+    done = [run for run in done if not run.error]
+    for run in failed:
+        print(f" - {run.name or run.playlist_id}: FAILED ({run.error})")
+
+    # 3. Consolidate: one row per track, one enrichment pass over the union of artists
+    frames = [run.tracks for run in done if run.tracks is not None and not run.tracks.empty]
+    if frames:
+        tracks_df = pd.concat(frames, ignore_index=True)
+        tracks_df = tracks_df[~tracks_df["track_id"].duplicated()]
+    else:
+        tracks_df = normalize_tracks([], "", "")
+    artists_df = normalize_artists(tracks_df)
+    print(f"\n {len(tracks_df)} tracks and {len(artists_df)} distinct artists across {len(done)} playlists")
+
+    artist_cache = ArtistCache()
+    artists_df = enrich_artists(artists_df, client, artist_cache)
+    artist_cache.report()
+    artist_cache.close()
+
+    tracks_df, artists_df = finalize_frames(tracks_df, artists_df)
+
+    # 4. One consolidated load, then per-playlist membership and state
+    backend.load(tracks_df, artists_df)
+    # Tracks only: enriched artists may come from the artist cache (see run_etl --popularity-snapshot)
+    backend.append_snapshots(snapshot_rows(tracks_df, snapshot_date=run_date()))
+
+    for run in done:
+        c = backend.sync_playlist_tracks(run.playlist_id, membership_frame(run.members))
+        run.landing.finish(snapshot_id=run.snapshot_id)
+
+        newest = run.tracks["added_at"].max() if run.tracks is not None else None
+        last_added_at = run.last_added_at
+        if pd.notna(newest):
+            last_added_at = max(filter(None, [last_added_at, newest.strftime("%Y-%m-%dT%H:%M:%S")]))
+        backend.save_playlist_state(run.playlist_id, run.snapshot_id, last_added_at)
+
+        print(f" - {run.name}: {len(run.tracks)} new items; membership "
+              f"+{c['added']} -{c['removed']} ({c['unchanged']} unchanged)")
+
+    backend.close()
+    client.close()
+
+    print(f"\n Multi-playlist ETL completed: {len(done)} loaded, {len(failed)} failed, "
+          f"{len(unchanged)} unchanged.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spotify ETL for many playlists at once")
+    parser.add_argument("--playlist", action="append", default=[], metavar="ID[=NAME]",
+                        help="Playlist to crawl (repeatable)")
+    parser.add_argument("--config", help="JSON file listing playlists")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Ignore stored snapshots/watermarks and reprocess every playlist")
+    parser.add_argument("--workers", type=int, default=PLAYLIST_WORKERS,
+                        help="Playlists crawled in parallel")
+    parser.add_argument("--backend", choices=list(BACKENDS),
+                        help="Storage backend (default: STORAGE_BACKEND, else mysql)")
+    parser.add_argument("--storage-path",
+                        help="Database file for the sqlite/duckdb backends (default: STORAGE_PATH)")
+    args = parser.parse_args()
+
+    playlists = [parse_playlist_spec(spec) for spec in args.playlist]
+    if args.config:
+        playlists += load_playlist_config(args.config)
+    # The same playlist listed twice would race on its landing and state
+    playlists = list({p["id"]: p for p in playlists}.values())
+    if not playlists:
+        parser.error("give at least one --playlist or a --config file")
+
+    try:
+        backend = get_backend(args.backend, args.storage_path)
+    except ValueError as e:
+        parser.error(str(e))
+    main(playlists, full_refresh=args.full_refresh, backend=backend, workers=args.workers)
@@ -0,0 +1,46 @@
+# etl/schema.py
+#
+# Column dtypes shared by the ETL output and the dashboards. Repeated strings
+# are categoricals, unique strings use pandas' string dtype, and numeric
+# columns use the smallest nullable integer that fits Spotify's ranges.
+
+import pandas as pd
+
+TRACK_DTYPES = {
+    "track_id": "string",
+    "track_name": "string",
+    "base_name": "category",
+    "album_name": "category",
+    "artist_id": "category",
+    "artist_name": "category",
+    "popularity": "Int8",           # 0-100
+    "duration_ms": "Int32",         # < 2^31 ms
+    "added_at": "datetime64[s]",
+    "playlist_name": "category",
+    "playlist_id": "category",
+}
+
+ARTIST_DTYPES = {
+    "artist_id": "string",
+    "artist_name": "category",
+    "genres": "category",
+    "followers": "Int32",
+    "artist_popularity": "Int8",    # 0-100
+}
+
+
+def apply_schema(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Cast the columns of df that appear in dtypes; other columns are left alone."""
+    casts = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith("datetime64"):
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        elif dtype.startswith("Int"):
+            # Float columns (NaN-promoted ints) need an explicit round-trip
+            casts[col] = dtype
+            df[col] = pd.to_numeric(df[col])
+        else:
+            casts[col] = dtype
+    return df.astype(casts)
@@ -0,0 +1,253 @@
+# etl/snapshots.py
+#
+# Append-only popularity history in popularity_snapshots (migrations/0002),
+# keyed by run date; the tracks/artists tables keep only the latest values.
+# ETL runs append a row per track they process; the daily popularity pass
+# (`python -m etl.run_etl --popularity-snapshot`) appends every track in the
+# playlist and its artists, read fresh from the API.
+#
+#   python -m etl.snapshots partitions             list monthly partitions
+#   python -m etl.snapshots prune --keep-months 24 drop partitions older than that
+
+import argparse
+from datetime import date, datetime, timezone
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+import pandas as pd
+from sqlalchemy import text
+from .db import get_engine
+from .schema import TRACK_DTYPES, ARTIST_DTYPES, apply_schema
+
+SNAPSHOT_TABLE = "popularity_snapshots"
+SNAPSHOT_COLUMNS = ["snapshot_date", "entity_type", "entity_id", "popularity", "followers"]
+
+# Spotify `fields=` projection for the popularity-only pass
+SNAPSHOT_ITEM_FIELDS = "items(track(id,popularity,artists(id)))"
+
+PARTITION_MONTHS_AHEAD = 2      # Monthly partitions kept ready past the current month
+SNAPSHOT_BATCH_SIZE = 5000      # Rows per multi-row INSERT
+
+# Period expressions per granularity, for server-side downsampling
+MYSQL_BUCKETS = {
+    "day": "snapshot_date",
+    "week": "DATE_SUB(snapshot_date, INTERVAL WEEKDAY(snapshot_date) DAY)",
+    "month": "DATE_FORMAT(snapshot_date, '%Y-%m-01')",
+}
+
+
+def run_date() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def snapshot_rows(tracks_df: pd.DataFrame,
+                  artists_df: Optional[pd.DataFrame] = None,
+                  snapshot_date: Optional[date] = None) -> pd.DataFrame:
+    """One snapshot row per track (and artist, if given), built column-wise from the frames.
+
+    Only pass artists whose values were just read from the API: enriched
+    artists can come from the artist cache, up to ARTIST_CACHE_TTL old.
+    """
+    snapshot_date = snapshot_date or run_date()
+    rows = pd.DataFrame({
+        "entity_type": "track",
+        "entity_id": tracks_df["track_id"].astype(object),
+        "popularity": tracks_df["popularity"],
+        "followers": pd.array([pd.NA] * len(tracks_df), dtype="Int32"),
+    })
+    if artists_df is not None:
+        artists = pd.DataFrame({
+            "entity_type": "artist",
+            "entity_id": artists_df["artist_id"].astype(object),
+            "popularity": artists_df["artist_popularity"],
+            "followers": artists_df["followers"],
+        })
+        rows = pd.concat([rows, artists], ignore_index=True)
+    rows = rows[rows["entity_id"].notna()]
+    rows.insert(0, "snapshot_date", pd.Timestamp(snapshot_date))
+    return rows[SNAPSHOT_COLUMNS]
+
+
+def popularity_frames(raw_items: Iterable[Dict[str, Any]],
+                      client,
+                      artist_cache=None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Current track and artist popularity for a playlist, without a full transform.
+
+    Track popularity comes straight from the items. Each track's first artist
+    (as in normalize_tracks) is fetched from the API rather than read from the
+    artist cache, and the cache is refreshed with the result.
+    """
+    track_ids, popularity, artist_ids = [], [], []
+    for item in raw_items:
+        track = item.get("track")
+        if not track or not track.get("id"):
+            continue
+        artists = track.get("artists")
+        track_ids.append(track["id"])
+        popularity.append(track.get("popularity"))
+        artist_ids.append((artists[0] if artists else {}).get("id"))
+
+    tracks = pd.DataFrame({"track_id": track_ids, "popularity": popularity})
+    tracks = tracks.drop_duplicates("track_id").reset_index(drop=True)
+
+    unique_ids = list(dict.fromkeys(a for a in artist_ids if a))
+    details = {a: d for a, d in zip(unique_ids, client.get_artists(unique_ids)) if d}
+    if artist_cache is not None:
+        artist_cache.put_many(details)
+    artists = pd.DataFrame({
+        "artist_id": list(details),
+        "followers": [d.get("followers", {}).get("total") for d in details.values()],
+        "artist_popularity": [d.get("popularity") for d in details.values()],
+    })
+    return apply_schema(tracks, TRACK_DTYPES), apply_schema(artists, ARTIST_DTYPES)
+
+
+# TREND QUERY
+def choose_bucket(start: date, end: date, max_points: int) -> str:
+    """Finest granularity that keeps each series within max_points points."""
+    days = max((end - start).days, 1)
+    if days <= max_points:
+        return "day"
+    if days / 7 <= max_points:
+        return "week"
+    return "month"
+
+
+def trend_query(bucket_sql: str, n_ids: int, placeholder: str) -> str:
+    """Downsampled trend SQL; placeholder formats a parameter name (":{}" or "${}")."""
+    ids = ", ".join(placeholder.format(f"id{i}") for i in range(n_ids))
+    return (
+        f"SELECT {bucket_sql} AS period, entity_id, "
+        f"AVG(popularity) AS popularity, MAX(followers) AS followers "
+        f"FROM {SNAPSHOT_TABLE} "
+        f"WHERE entity_type = {placeholder.format('entity_type')} "
+        f"AND snapshot_date >= {placeholder.format('start')} "
+        f"AND snapshot_date < {placeholder.format('end')} "
+        f"AND entity_id IN ({ids}) "
+        f"GROUP BY period, entity_id "
+        f"ORDER BY period, entity_id"
+    )
+
+
+def trend_params(entity_type: str, entity_ids: Sequence[str], start: date, end: date) -> Dict[str, Any]:
+    params = {"entity_type": entity_type, "start": start, "end": end}
+    params.update({f"id{i}": entity_id for i, entity_id in enumerate(entity_ids)})
+    return params
+
+
+def popularity_trend(entity_type: str,
+                     entity_ids: Sequence[str],
+                     start: date,
+                     end: date,
+                     max_points: int = 120,
+                     engine=None) -> pd.DataFrame:
+    """Popularity (and followers) over time for a few entities, downsampled in MySQL.
+
+    Returns one row per (period, entity_id). The range filter prunes to the
+    matching monthly partitions and the primary key covers the entity lookup.
+    """
+    if not entity_ids:
+        return pd.DataFrame(columns=["period", "entity_id", "popularity", "followers"])
+
+    bucket = choose_bucket(start, end, max_points)
+    sql = trend_query(MYSQL_BUCKETS[bucket], len(entity_ids), ":{}")
+    with (engine or get_engine()).connect() as conn:
+        df = pd.read_sql(text(sql), conn, params=trend_params(entity_type, entity_ids, start, end))
+    df["period"] = pd.to_datetime(df["period"])
+    return df
+
+
+# MYSQL APPENDS AND PARTITIONS
+def _month_start(d: date, offset: int = 0) -> date:
+    month = d.month - 1 + offset
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def list_partitions(engine=None) -> List[Tuple[str, Optional[str]]]:
+    """(partition name, upper bound) in order; the catch-all's bound is None."""
+    with (engine or get_engine()).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": SNAPSHOT_TABLE}).all()
+    return [(name, None if bound == "MAXVALUE" else bound.strip("'")) for name, bound in rows]
+
+
+def ensure_partitions(today: Optional[date] = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD,
+                      engine=None):
+    """Split monthly partitions off the catch-all up to months_ahead past today.
+
+    Runs before appending, while pmax is still empty, so the reorganize only
+    rewrites metadata.
+    """
+    engine = engine or get_engine()
+    today = today or run_date()
+    bounds = [bound for _, bound in list_partitions(engine) if bound]
+    last = date.fromisoformat(bounds[-1]) if bounds else _month_start(today)
+
+    new = []
+    upper = _month_start(last, 1) if bounds else _month_start(today, 1)
+    while upper <= _month_start(today, months_ahead + 1):
+        lower = _month_start(upper, -1)
+        new.append(f"PARTITION p{lower:%Y_%m} VALUES LESS THAN ('{upper.isoformat()}')")
+        upper = _month_start(upper, 1)
+
+    if new:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {SNAPSHOT_TABLE} REORGANIZE PARTITION pmax INTO ("
+                + ", ".join(new) + ", PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            ))
+
+
+def prune_partitions(keep_months: int, today: Optional[date] = None, engine=None) -> List[str]:
+    """Drop monthly partitions that end before the retention window; returns their names."""
+    engine = engine or get_engine()
+    cutoff = _month_start(today or run_date(), -keep_months)
+    old = [
+        name for name, bound in list_partitions(engine)
+        if bound and date.fromisoformat(bound) <= cutoff
+    ]
+    if old:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {SNAPSHOT_TABLE} DROP PARTITION {', '.join(old)}"))
+    return old
+
+
+def append_snapshots(rows: pd.DataFrame, engine=None, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+    """Bulk-append snapshot rows; a second run on the same day keeps the first values."""
+    if rows.empty:
+        return 0
+
+    from .load import _to_records
+
+    stmt = text(
+        f"INSERT IGNORE INTO {SNAPSHOT_TABLE} ({', '.join(SNAPSHOT_COLUMNS)}) "
+        f"VALUES ({', '.join(':' + c for c in SNAPSHOT_COLUMNS)})"
+    )
+    records = _to_records(rows)
+    with (engine or get_engine()).begin() as conn:
+        for start in range(0, len(records), batch_size):
+            conn.execute(stmt, records[start:start + batch_size])
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popularity snapshot partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("partitions", help="List monthly partitions")
+    p = sub.add_parser("prune", help="Drop partitions older than the retention window")
+    p.add_argument("--keep-months", type=int, default=24)
+    args = parser.parse_args()
+
+    if args.command == "partitions":
+        for name, bound in list_partitions():
+            print(f"{name:<10} < {bound or 'MAXVALUE'}")
+    elif args.command == "prune":
+        dropped = prune_partitions(args.keep_months)
+        print(f"Dropped {len(dropped)} partition(s): {', '.join(dropped) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,42 @@
 # etl/spotify_client.py
 
 import base64
+import hashlib
+import random
+import time
 import requests
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Iterator
 from .config import (
     SPOTIFY_CLIENT_ID,
     SPOTIFY_CLIENT_SECRET,
+    SPOTIFY_TOKEN_URL,
+    SPOTIFY_API_BASE,
+    MARKET,
     MAX_TRACKS_PER_REQUEST,
+    MAX_ARTISTS_PER_REQUEST,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    MAX_RETRIES,
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    FETCH_WORKERS,
 )
+from .token_manager import TokenManager
+from .rate_limiter import RateLimiter, shared_limiter
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the standard library
+    import json
+
+    _json_loads = json.loads
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 
 class SpotifyClientError(Exception):
@@ -19,21 +48,92 @@ class SpotifyClientError(Exception):
 class SpotifyClient:
     """Spotify API Client (Client Credentials Flow)."""
 
-    def __init__(self):
-        if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
+    def __init__(self,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 client_id: Optional[str] = None,
+                 client_secret: Optional[str] = None):
+        self.client_id = client_id or SPOTIFY_CLIENT_ID
+        self.client_secret = client_secret or SPOTIFY_CLIENT_SECRET
+        if not self.client_id or not self.client_secret:
             raise SpotifyClientError(
                 "Missing Spotify credentials. Set SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET in .env"
             )
 
-        self.client_id = SPOTIFY_CLIENT_ID
-        self.client_secret = SPOTIFY_CLIENT_SECRET
-        self.token_url = "https://accounts.spotify.com/api/token"
-        self.api_base = "https://api.spotify.com/v1"
-        self.access_token = None
+        self.token_url = SPOTIFY_TOKEN_URL
+        self.api_base = SPOTIFY_API_BASE
+        self.session = self._build_session()
+        self.limiter = rate_limiter or shared_limiter()
+        self.tokens = TokenManager(
+            self._fetch_token,
+            # Keyed on the token endpoint too, so a fake-server token never reaches the real API
+            cache_key=hashlib.sha256(f"{self.client_id}@{self.token_url}".encode()).hexdigest(),
+        )
+
+    # HTTP SESSION
+    def _build_session(self) -> requests.Session:
+        """Keep-alive session with a bounded connection pool."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            pool_block=True,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def _backoff_delay(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        """Retry-After when the server sends one, otherwise jittered exponential backoff."""
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying 429/5xx/connection errors and refreshing the token on 401."""
+        refreshed = False
+        attempt = 0
+
+        while True:
+            try:
+                with self.limiter.slot():
+                    resp = self.session.request(
+                        method, url, timeout=HTTP_TIMEOUT, **kwargs
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= MAX_RETRIES:
+                    raise SpotifyClientError(f"Request failed after {attempt} retries: {e}")
+                time.sleep(self._backoff_delay(attempt, None))
+                attempt += 1
+                continue
+
+            self.limiter.record(resp.status_code)
+
+            if resp.status_code == 401 and not refreshed and url != self.token_url:
+                self.authenticate(force=True)
+                kwargs["headers"] = {**kwargs.get("headers", {}), **self._auth_header()}
+                refreshed = True
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = self._backoff_delay(attempt, resp)
+                print(f"Spotify returned {resp.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            return resp
 
     # AUTHENTICATION
-    def authenticate(self):
-        """Authenticate using Client Credentials Flow."""
+    def _fetch_token(self):
+        """Request a new token using Client Credentials Flow."""
         auth_str = f"{self.client_id}:{self.client_secret}"
         b64_auth = base64.b64encode(auth_str.encode()).decode()
 
@@ -44,49 +144,141 @@ class SpotifyClient:
 
         data = {"grant_type": "client_credentials"}
 
-        resp = requests.post(self.token_url, headers=headers, data=data)
+        resp = self._request("POST", self.token_url, headers=headers, data=data)
 
         if resp.status_code != 200:
             raise SpotifyClientError(
                 f"Failed to authenticate ({resp.status_code}): {resp.text}"
             )
 
-        self.access_token = resp.json()["access_token"]
+        payload = resp.json()
+        return payload["access_token"], int(payload.get("expires_in", 3600))
+
+    def authenticate(self, force: bool = False):
+        """Authenticate, reusing a cached unexpired token unless force=True."""
+        self.tokens.get_token(force=force)
+
+    @property
+    def access_token(self):
+        return self.tokens.access_token
 
     def _auth_header(self):
-        if not self.access_token:
-            self.authenticate()
-        return {"Authorization": f"Bearer {self.access_token}"}
+        return {"Authorization": f"Bearer {self.tokens.get_token()}"}
+
+    # PLAYLIST METADATA
+    def get_playlist_meta(self, playlist_id: str, fields: str = "name,snapshot_id") -> Dict[str, Any]:
+        """Return top-level playlist fields (without its tracks)."""
+        url = f"{self.api_base}/playlists/{playlist_id}"
+        headers = self._auth_header()
+
+        resp = self._request("GET", url, headers=headers, params={"fields": fields})
+        if resp.status_code != 200:
+            raise SpotifyClientError(
+                f"Error fetching playlist ({resp.status_code}): {resp.text}"
+            )
+
+        return _json_loads(resp.content)
+
+    def get_playlist_snapshot_id(self, playlist_id: str) -> str:
+        """Return the playlist's current snapshot_id (changes on every edit)."""
+        return self.get_playlist_meta(playlist_id, fields="snapshot_id").get("snapshot_id")
 
     # PLAYLIST TRACKS
-    def get_playlist_tracks(self, playlist_id: str) -> List[Dict[str, Any]]:
-        """Returns all track items from a playlist with pagination."""
-        all_items = []
-        offset = 0
+    def _get_playlist_page(self, playlist_id: str, offset: int, limit: int,
+                           fields: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch one page of playlist items, optionally projected to `fields`."""
+        url = f"{self.api_base}/playlists/{playlist_id}/tracks"
+        params = {"offset": offset, "limit": limit}
+        if fields:
+            # `total` and `limit` are always needed to drive pagination
+            params["fields"] = f"total,limit,{fields}"
+        headers = self._auth_header()
+
+        resp = self._request("GET", url, headers=headers, params=params)
+        if resp.status_code != 200:
+            raise SpotifyClientError(
+                f"Error fetching playlist tracks ({resp.status_code}): {resp.text}"
+            )
+
+        return _json_loads(resp.content)
+
+    def iter_pages(self, playlist_id: str,
+                   concurrent: bool = False,
+                   max_workers: int = FETCH_WORKERS,
+                   fields: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield playlist pages in order, one raw page payload at a time.
+
+        With concurrent=True the first page's `total` drives parallel fetches of
+        the remaining offsets; at most max_workers pages are in flight, so
+        memory stays bounded by the page size rather than the playlist size.
+        `fields` is passed through as Spotify's response projection.
+        """
         limit = MAX_TRACKS_PER_REQUEST
 
-        while True:
-            url = f"{self.api_base}/playlists/{playlist_id}/tracks"
-            params = {"offset": offset, "limit": limit}
-            headers = self._auth_header()
+        if not concurrent:
+            offset = 0
+            while True:
+                data = self._get_playlist_page(playlist_id, offset, limit, fields)
+                yield data
 
-            resp = requests.get(url, headers=headers, params=params)
-            if resp.status_code != 200:
-                raise SpotifyClientError(
-                    f"Error fetching playlist tracks ({resp.status_code}): {resp.text}"
-                )
+                items = data.get("items", [])
+                # The server may cap the page below what we asked for
+                if not items or len(items) < (data.get("limit") or limit):
+                    break
 
-            data = resp.json()
-            items = data.get("items", [])
+                offset += len(items)
+            return
 
-            all_items.extend(items)
+        first = self._get_playlist_page(playlist_id, 0, limit, fields)
+        yield first
 
-            if len(items) < limit:
-                break
+        total = first.get("total") or 0
+        step = first.get("limit") or limit
+        offsets = iter(range(step, total, step))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = deque()
+            for off in offsets:
+                in_flight.append(pool.submit(self._get_playlist_page, playlist_id, off, limit, fields))
+                if len(in_flight) >= max_workers:
+                    break
+
+            while in_flight:
+                page = in_flight.popleft().result()
+                next_off = next(offsets, None)
+                if next_off is not None:
+                    in_flight.append(pool.submit(self._get_playlist_page, playlist_id, next_off, limit, fields))
+                yield page
+
+    def iter_playlist_tracks(self, playlist_id: str,
+                             concurrent: bool = False,
+                             max_workers: int = FETCH_WORKERS,
+                             fields: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield playlist track items page by page."""
+        for page in self.iter_pages(playlist_id, concurrent, max_workers, fields):
+            yield from page.get("items", [])
+
+    def get_playlist_tracks(self, playlist_id: str,
+                            concurrent: bool = False,
+                            max_workers: int = FETCH_WORKERS,
+                            fields: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns all track items from a playlist with pagination."""
+        return list(self.iter_playlist_tracks(playlist_id, concurrent, max_workers, fields))
+
+    # SEARCH
+    def search_playlists(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search playlists by keyword (entries may be None for removed playlists)."""
+        url = f"{self.api_base}/search"
+        params = {"q": query, "type": "playlist", "limit": limit, "market": MARKET}
+        headers = self._auth_header()
 
-            offset += limit
+        resp = self._request("GET", url, headers=headers, params=params)
+        if resp.status_code != 200:
+            raise SpotifyClientError(
+                f"Error searching playlists ({resp.status_code}): {resp.text}"
+            )
 
-        return all_items
+        return _json_loads(resp.content).get("playlists", {}).get("items", [])
 
     # ARTIST DETAILS
     def get_artist(self, artist_id: str) -> Dict[str, Any]:
@@ -94,7 +286,7 @@ class SpotifyClient:
         url = f"{self.api_base}/artists/{artist_id}"
         headers = self._auth_header()
 
-        resp = requests.get(url, headers=headers)
+        resp = self._request("GET", url, headers=headers)
 
         if resp.status_code == 403:
             print("Artist details unavailable (403 Forbidden)")
@@ -106,3 +298,32 @@ class SpotifyClient:
             )
 
         return resp.json()
+
+    def get_artists(self, artist_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch artist details in batches, aligned with artist_ids ({} when unavailable)."""
+        details = {}
+        url = f"{self.api_base}/artists"
+        unique_ids = list(dict.fromkeys(a for a in artist_ids if a))
+
+        for start in range(0, len(unique_ids), MAX_ARTISTS_PER_REQUEST):
+            chunk = unique_ids[start:start + MAX_ARTISTS_PER_REQUEST]
+            headers = self._auth_header()
+
+            resp = self._request(
+                "GET", url, headers=headers, params={"ids": ",".join(chunk)}
+            )
+
+            if resp.status_code == 403:
+                print(f"Artist details unavailable for {len(chunk)} artists (403 Forbidden)")
+                continue
+
+            if resp.status_code != 200:
+                raise SpotifyClientError(
+                    f"Error fetching artist details ({resp.status_code}): {resp.text}"
+                )
+
+            for artist in _json_loads(resp.content).get("artists", []):
+                if artist:
+                    details[artist["id"]] = artist
+
+        return [details.get(artist_id, {}) for artist_id in artist_ids]
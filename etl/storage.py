@@ -0,0 +1,526 @@
+# etl/storage.py
+#
+# Storage backends for the load stage. run_etl talks to a backend rather than
+# to MySQL directly, so the same pipeline can load into:
+#
+#   mysql   the production database (etl/load.py)
+#   sqlite  a local file, for tests and offline runs (stdlib only)
+#   duckdb  a local columnar file, for fast analytics (needs `pip install duckdb`)
+#
+#   STORAGE_BACKEND=sqlite STORAGE_PATH=data/spotify.sqlite python -m etl.run_etl
+#
+# Every backend has the same upsert semantics: rows are keyed by their primary
+# key, rows with an unchanged row_hash are skipped, and load() returns
+# inserted/updated/unchanged counts per table.
+
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional, Sequence, Tuple
+import pandas as pd
+from .config import STORAGE_BACKEND, STORAGE_PATH
+from . import snapshots
+from .transform import TRACK_COLUMNS, ARTIST_COLUMNS
+from .load import (
+    load_to_mysql, get_playlist_state, save_playlist_state, split_by_hash, sync_playlist_tracks,
+    LOAD_MODE, INSERT_ONLY_COLUMNS,
+)
+
+try:
+    import duckdb
+except ImportError:  # duckdb is optional; only DuckDBBackend needs it
+    duckdb = None
+
+DEFAULT_PATHS = {
+    "sqlite": "data/spotify.sqlite",
+    "duckdb": "data/spotify.duckdb",
+}
+
+# Table definitions for the embedded backends, kept in step with schema.sql
+EMBEDDED_DDL = """
+CREATE TABLE IF NOT EXISTS artists (
+    artist_id VARCHAR PRIMARY KEY,
+    artist_name VARCHAR,
+    genres VARCHAR,
+    followers INTEGER,
+    artist_popularity INTEGER,
+    row_hash {hash_type},
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tracks (
+    track_id VARCHAR PRIMARY KEY,
+    track_name VARCHAR,
+    base_name VARCHAR,
+    album_name VARCHAR,
+    artist_id VARCHAR,
+    artist_name VARCHAR,
+    popularity INTEGER,
+    duration_ms INTEGER,
+    added_at TIMESTAMP,
+    playlist_name VARCHAR,
+    playlist_id VARCHAR,
+    row_hash {hash_type},
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS etl_state (
+    playlist_id VARCHAR PRIMARY KEY,
+    snapshot_id VARCHAR,
+    last_added_at VARCHAR
+);
+
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id VARCHAR NOT NULL,
+    track_id VARCHAR NOT NULL,
+    added_at TIMESTAMP,
+    PRIMARY KEY (playlist_id, track_id)
+);
+
+CREATE TABLE IF NOT EXISTS popularity_snapshots (
+    snapshot_date DATE NOT NULL,
+    entity_type VARCHAR NOT NULL,
+    entity_id VARCHAR NOT NULL,
+    popularity INTEGER,
+    followers INTEGER,
+    PRIMARY KEY (entity_type, entity_id, snapshot_date)
+);
+"""
+
+# Same secondary indexes as the MySQL migrations (DuckDB relies on zone maps instead;
+# its ON CONFLICT DO UPDATE cannot assign to indexed columns)
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tracks_artist_id ON tracks (artist_id);
+CREATE INDEX IF NOT EXISTS idx_tracks_playlist_added ON tracks (playlist_id, added_at);
+CREATE INDEX IF NOT EXISTS idx_tracks_base_name ON tracks (base_name);
+CREATE INDEX IF NOT EXISTS idx_playlist_tracks_track_id ON playlist_tracks (track_id);
+"""
+
+TABLE_COLUMNS = {
+    "tracks": TRACK_COLUMNS + ["row_hash"],
+    "artists": ARTIST_COLUMNS + ["row_hash"],
+}
+
+
+def _print_counts(counts: Dict[str, Dict[str, int]]):
+    for table_name, c in counts.items():
+        print(f"  {table_name}: {c['inserted']} inserted, {c['updated']} updated, "
+              f"{c['unchanged']} unchanged")
+
+
+class StorageBackend(ABC):
+    """Load target for the ETL, plus the per-playlist incremental state."""
+
+    name = "base"
+
+    @abstractmethod
+    def load(self, tracks_df: pd.DataFrame, artists_df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+        ...
+
+    @abstractmethod
+    def get_playlist_state(self, playlist_id: str) -> Tuple[Optional[str], Optional[str]]:
+        ...
+
+    @abstractmethod
+    def save_playlist_state(self, playlist_id: str, snapshot_id: str, last_added_at: Optional[str]):
+        ...
+
+    @abstractmethod
+    def query(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def sync_playlist_tracks(self, playlist_id: str, members: pd.DataFrame) -> Dict[str, int]:
+        """Make playlist_tracks match members (track_id, added_at) for one playlist.
+
+        Returns added/updated/removed/unchanged membership counts.
+        """
+
+    @abstractmethod
+    def append_snapshots(self, rows: pd.DataFrame) -> int:
+        """Append popularity snapshot rows (see etl/snapshots.py); returns rows sent."""
+
+    @abstractmethod
+    def popularity_trend(self,
+                         entity_type: str,
+                         entity_ids: Sequence[str],
+                         start: date,
+                         end: date,
+                         max_points: int = 120) -> pd.DataFrame:
+        """Downsampled popularity history, one row per (period, entity_id)."""
+
+    def close(self):
+        pass
+
+
+# MYSQL
+class MySQLBackend(StorageBackend):
+    """The production MySQL database, via the loaders in etl/load.py."""
+
+    name = "mysql"
+
+    def __init__(self, mode: str = LOAD_MODE):
+        self.mode = mode
+        self._partitions_ready = False
+
+    def load(self, tracks_df, artists_df):
+        return load_to_mysql(tracks_df, artists_df, self.mode)
+
+    def get_playlist_state(self, playlist_id):
+        return get_playlist_state(playlist_id)
+
+    def save_playlist_state(self, playlist_id, snapshot_id, last_added_at):
+        save_playlist_state(playlist_id, snapshot_id, last_added_at)
+
+    def query(self, sql, params=None):
+        from sqlalchemy import text
+        from .db import get_engine
+        with get_engine().connect() as conn:
+            return pd.read_sql(text(sql), conn, params=params)
+
+    def sync_playlist_tracks(self, playlist_id, members):
+        return sync_playlist_tracks(playlist_id, members)
+
+    def append_snapshots(self, rows):
+        if not self._partitions_ready:
+            snapshots.ensure_partitions()
+            self._partitions_ready = True
+        return snapshots.append_snapshots(rows)
+
+    def popularity_trend(self, entity_type, entity_ids, start, end, max_points=120):
+        return snapshots.popularity_trend(entity_type, entity_ids, start, end, max_points)
+
+
+# EMBEDDED (SQLite / DuckDB)
+class EmbeddedBackend(StorageBackend):
+    """Shared upsert logic for single-file databases with INSERT ... ON CONFLICT."""
+
+    # Period expressions for snapshots.trend_query, per granularity
+    buckets: Dict[str, str] = {}
+    # Null-safe inequality operator
+    distinct_op = "IS DISTINCT FROM"
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    @abstractmethod
+    def _stored_hashes(self, table_name: str, pk: str, keys) -> Dict[Any, Any]:
+        ...
+
+    @abstractmethod
+    def _write(self, df: pd.DataFrame, table_name: str, pk: str):
+        ...
+
+    def _prepare(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        """Restrict df to the table's columns before diffing and writing."""
+        return df[[c for c in TABLE_COLUMNS[table_name] if c in df.columns]]
+
+    def _upsert_sql(self, table_name: str, pk: str, columns) -> str:
+        cols = ", ".join(columns)
+        updates = ", ".join(
+            f"{c} = excluded.{c}" for c in columns if c != pk and c not in INSERT_ONLY_COLUMNS
+        )
+        return f"INSERT INTO {table_name} ({cols}) {{source}} ON CONFLICT ({pk}) DO UPDATE SET {updates}"
+
+    def upsert(self, df: pd.DataFrame, table_name: str, pk: str) -> Dict[str, int]:
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if df.empty:
+            return counts
+
+        df = self._prepare(df, table_name)
+        if "row_hash" in df.columns:
+            stored = self._stored_hashes(table_name, pk, df[pk].astype(object).tolist())
+            df, counts = split_by_hash(df, pk, stored)
+        else:
+            counts["inserted"] = len(df)
+
+        if not df.empty:
+            self._write(df, table_name, pk)
+        return counts
+
+    def load(self, tracks_df, artists_df):
+        print(f"Loading into {self.name} ({self.path})…")
+        counts = {
+            "artists": self.upsert(artists_df, "artists", "artist_id"),
+            "tracks": self.upsert(tracks_df, "tracks", "track_id"),
+        }
+        _print_counts(counts)
+        print("Load complete!")
+        return counts
+
+    def get_playlist_state(self, playlist_id):
+        # `$name` placeholders work in both SQLite and DuckDB
+        rows = self.query(
+            "SELECT snapshot_id, last_added_at FROM etl_state WHERE playlist_id = $pid",
+            {"pid": playlist_id},
+        )
+        if rows.empty:
+            return None, None
+        return rows.iloc[0, 0], rows.iloc[0, 1]
+
+    @abstractmethod
+    def _stage_members(self, members: pd.DataFrame):
+        """Make members queryable as stg_playlist_tracks(track_id, added_at)."""
+
+    @abstractmethod
+    def _unstage_members(self):
+        ...
+
+    @abstractmethod
+    def _execute(self, sql: str, params: Dict[str, Any]) -> int:
+        """Run one DML statement; returns the number of affected rows."""
+
+    def sync_playlist_tracks(self, playlist_id, members):
+        params = {"pid": playlist_id}
+        self._stage_members(members[["track_id", "added_at"]])
+        try:
+            added = self._execute(
+                "INSERT INTO playlist_tracks (playlist_id, track_id, added_at) "
+                "SELECT $pid, s.track_id, s.added_at FROM stg_playlist_tracks s "
+                "WHERE NOT EXISTS (SELECT 1 FROM playlist_tracks pt "
+                "WHERE pt.playlist_id = $pid AND pt.track_id = s.track_id)",
+                params,
+            )
+            updated = self._execute(
+                # Correlated subqueries rather than UPDATE ... FROM (SQLite 3.33+)
+                "UPDATE playlist_tracks SET added_at = (SELECT s.added_at FROM stg_playlist_tracks s "
+                "WHERE s.track_id = playlist_tracks.track_id) "
+                "WHERE playlist_id = $pid AND EXISTS (SELECT 1 FROM stg_playlist_tracks s "
+                "WHERE s.track_id = playlist_tracks.track_id "
+                f"AND s.added_at {self.distinct_op} playlist_tracks.added_at)",
+                params,
+            )
+            removed = self._execute(
+                "DELETE FROM playlist_tracks WHERE playlist_id = $pid "
+                "AND NOT EXISTS (SELECT 1 FROM stg_playlist_tracks s "
+                "WHERE s.track_id = playlist_tracks.track_id)",
+                params,
+            )
+        finally:
+            self._unstage_members()
+
+        return {"added": added, "updated": updated, "removed": removed,
+                "unchanged": len(members) - added - updated}
+
+    def popularity_trend(self, entity_type, entity_ids, start, end, max_points=120):
+        if not entity_ids:
+            return pd.DataFrame(columns=["period", "entity_id", "popularity", "followers"])
+        bucket = snapshots.choose_bucket(start, end, max_points)
+        df = self.query(
+            snapshots.trend_query(self.buckets[bucket], len(entity_ids), "${}"),
+            snapshots.trend_params(entity_type, entity_ids, start.isoformat(), end.isoformat()),
+        )
+        df["period"] = pd.to_datetime(df["period"])
+        return df
+
+
+class SQLiteBackend(EmbeddedBackend):
+    """Local SQLite file (stdlib only), mainly for tests and offline runs."""
+
+    name = "sqlite"
+    buckets = {
+        "day": "snapshot_date",
+        "week": "date(snapshot_date, '-' || ((CAST(strftime('%w', snapshot_date) AS INTEGER) + 6) % 7) || ' days')",
+        "month": "strftime('%Y-%m-01', snapshot_date)",
+    }
+    # IS DISTINCT FROM only arrived in SQLite 3.39; IS NOT has always been null-safe
+    distinct_op = "IS NOT"
+
+    def __init__(self, path: str = DEFAULT_PATHS["sqlite"]):
+        super().__init__(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(EMBEDDED_DDL.format(hash_type="INTEGER"))
+        self.conn.executescript(SQLITE_INDEXES)
+        self.conn.commit()
+
+    def _prepare(self, df, table_name):
+        df = super()._prepare(df, table_name)
+        if "row_hash" in df.columns:
+            # SQLite integers are signed 64-bit; store the hash's bit pattern
+            df = df.assign(row_hash=df["row_hash"].to_numpy().view("int64"))
+        return df
+
+    def _stored_hashes(self, table_name, pk, keys):
+        stored = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            stored.update(self.conn.execute(
+                f"SELECT {pk}, row_hash FROM {table_name} WHERE {pk} IN ({placeholders})",
+                chunk,
+            ).fetchall())
+        return stored
+
+    def _write(self, df, table_name, pk):
+        plain = df.astype(object)
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                plain[col] = df[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+        rows = plain.where(plain.notna(), None).itertuples(index=False, name=None)
+
+        sql = self._upsert_sql(table_name, pk, list(df.columns)).format(
+            source="VALUES (" + ", ".join("?" * len(df.columns)) + ")"
+        )
+        self.conn.executemany(sql, rows)
+        self.conn.commit()
+
+    def save_playlist_state(self, playlist_id, snapshot_id, last_added_at):
+        self.conn.execute(
+            "INSERT INTO etl_state (playlist_id, snapshot_id, last_added_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (playlist_id) DO UPDATE SET "
+            "snapshot_id = excluded.snapshot_id, last_added_at = excluded.last_added_at",
+            (playlist_id, snapshot_id, last_added_at),
+        )
+        self.conn.commit()
+
+    def _stage_members(self, members):
+        self.conn.execute("DROP TABLE IF EXISTS temp.stg_playlist_tracks")
+        self.conn.execute(
+            "CREATE TEMP TABLE stg_playlist_tracks (track_id TEXT PRIMARY KEY, added_at TEXT)"
+        )
+        added_at = members["added_at"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        self.conn.executemany(
+            "INSERT INTO stg_playlist_tracks (track_id, added_at) VALUES (?, ?)",
+            zip(members["track_id"].astype(object), added_at.astype(object).where(added_at.notna(), None)),
+        )
+
+    def _unstage_members(self):
+        self.conn.execute("DROP TABLE IF EXISTS temp.stg_playlist_tracks")
+        self.conn.commit()
+
+    def _execute(self, sql, params):
+        return self.conn.execute(sql, params).rowcount
+
+    def append_snapshots(self, rows):
+        if rows.empty:
+            return 0
+        plain = rows.astype(object)
+        plain["snapshot_date"] = rows["snapshot_date"].dt.strftime("%Y-%m-%d")
+        cols = snapshots.SNAPSHOT_COLUMNS
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO popularity_snapshots ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' * len(cols))})",
+            plain.where(plain.notna(), None)[cols].itertuples(index=False, name=None),
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def query(self, sql, params=None):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def close(self):
+        self.conn.close()
+
+
+class DuckDBBackend(EmbeddedBackend):
+    """Local DuckDB file: columnar storage and vectorized queries for analytics.
+
+    Frames are handed to DuckDB directly (no per-row conversion), and query()
+    returns DataFrames, so dashboards can push heavy aggregations down to it.
+    """
+
+    name = "duckdb"
+    buckets = {
+        "day": "snapshot_date",
+        "week": "date_trunc('week', snapshot_date)",
+        "month": "date_trunc('month', snapshot_date)",
+    }
+
+    def __init__(self, path: str = DEFAULT_PATHS["duckdb"], read_only: bool = False):
+        """read_only opens an existing file for query() alone (e.g. from a dashboard).
+
+        DuckDB allows one writing process or any number of readers, so opening
+        a file the ETL is writing raises duckdb.IOException.
+        """
+        if duckdb is None:
+            raise RuntimeError("The duckdb backend needs the duckdb package: pip install duckdb")
+        super().__init__(path)
+        self.conn = duckdb.connect(path, read_only=read_only)
+        if not read_only:
+            self.conn.execute(EMBEDDED_DDL.format(hash_type="UBIGINT"))
+
+    def _stored_hashes(self, table_name, pk, keys):
+        self.conn.register("incoming_keys", pd.DataFrame({pk: keys}))
+        try:
+            rows = self.conn.execute(
+                f"SELECT t.{pk}, t.row_hash FROM {table_name} t "
+                f"JOIN incoming_keys k ON t.{pk} = k.{pk}"
+            ).fetchall()
+        finally:
+            self.conn.unregister("incoming_keys")
+        return dict(rows)
+
+    def _write(self, df, table_name, pk):
+        cols = ", ".join(df.columns)
+        sql = self._upsert_sql(table_name, pk, list(df.columns)).format(
+            source=f"SELECT {cols} FROM incoming"
+        )
+        self.conn.register("incoming", df)
+        try:
+            self.conn.execute(sql)
+        finally:
+            self.conn.unregister("incoming")
+
+    def save_playlist_state(self, playlist_id, snapshot_id, last_added_at):
+        self.conn.execute(
+            "INSERT INTO etl_state (playlist_id, snapshot_id, last_added_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (playlist_id) DO UPDATE SET "
+            "snapshot_id = excluded.snapshot_id, last_added_at = excluded.last_added_at",
+            [playlist_id, snapshot_id, last_added_at],
+        )
+
+    def _stage_members(self, members):
+        self.conn.register("stg_playlist_tracks", members)
+
+    def _unstage_members(self):
+        self.conn.unregister("stg_playlist_tracks")
+
+    def _execute(self, sql, params):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def append_snapshots(self, rows):
+        if rows.empty:
+            return 0
+        cols = ", ".join(snapshots.SNAPSHOT_COLUMNS)
+        self.conn.register("incoming", rows)
+        try:
+            self.conn.execute(
+                f"INSERT OR IGNORE INTO popularity_snapshots ({cols}) SELECT {cols} FROM incoming"
+            )
+        finally:
+            self.conn.unregister("incoming")
+        return len(rows)
+
+    def query(self, sql, params=None):
+        return self.conn.execute(sql, params or {}).df()
+
+    def close(self):
+        self.conn.close()
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+    "duckdb": DuckDBBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, path: Optional[str] = None) -> StorageBackend:
+    """Build a backend, defaulting to STORAGE_BACKEND (and STORAGE_PATH with it).
+
+    path only applies to the file-based backends.
+    """
+    default_path = None
+    if name is None:
+        name, default_path = STORAGE_BACKEND, STORAGE_PATH
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "mysql":
+        if path:
+            raise ValueError("A storage path only applies to the sqlite and duckdb backends")
+        return MySQLBackend()
+    return BACKENDS[name](path or default_path or DEFAULT_PATHS[name])
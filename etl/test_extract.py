@@ -6,7 +6,7 @@ def main():
     print("\n Testing Spotify Extraction...")
     client = SpotifyClient()
 
-    # Force authentication (for debugging)
+    # Authenticate (reuses the cached token while it is still valid)
     client.authenticate()
     print("\n Access Token Successfully Retrieved!")
     print(client.access_token[:30], "...")
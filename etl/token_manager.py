@@ -0,0 +1,80 @@
+# etl/token_manager.py
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+from .config import TOKEN_CACHE_PATH, TOKEN_REFRESH_MARGIN
+
+
+class TokenManager:
+    """Tracks an access token's expiry and shares it through an on-disk cache.
+
+    `fetch` is called to obtain a fresh (access_token, expires_in) pair when the
+    cached token is missing or about to expire.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[], Tuple[str, int]],
+                 cache_key: str,
+                 cache_path: Optional[str] = TOKEN_CACHE_PATH,
+                 refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self._fetch = fetch
+        self.cache_key = cache_key
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.refresh_margin = refresh_margin
+        self.access_token = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return bool(self.access_token) and time.time() < self.expires_at - self.refresh_margin
+
+    # DISK CACHE
+    def _load(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            cached = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return
+        if cached.get("cache_key") == self.cache_key:
+            self.access_token = cached.get("access_token")
+            self.expires_at = float(cached.get("expires_at", 0))
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "cache_key": self.cache_key,
+                    "access_token": self.access_token,
+                    "expires_at": self.expires_at,
+                }, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Could not write token cache ({e})")
+
+    # TOKEN ACCESS
+    def get_token(self, force: bool = False) -> str:
+        """Return a valid token, reusing the cached one unless force=True."""
+        with self._lock:
+            if not force:
+                if self._is_fresh():
+                    return self.access_token
+                self._load()
+                if self._is_fresh():
+                    return self.access_token
+
+            token, expires_in = self._fetch()
+            self.access_token = token
+            self.expires_at = time.time() + expires_in
+            self._save()
+            return self.access_token
+
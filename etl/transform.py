@@ -1,38 +1,207 @@
 # etl/transform.py
 
+import re
+from functools import lru_cache
+from itertools import islice
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, Dict, Any, Optional, Tuple
+from .config import TRANSFORM_CHUNK_SIZE, SONG_KEY_CACHE_SIZE
+from .schema import TRACK_DTYPES, ARTIST_DTYPES, apply_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional (pandas and streamlit usually bring it)
+    pa = pc = None
+
+# Spotify `fields=` projection covering everything normalize_tracks reads
+PLAYLIST_ITEM_FIELDS = (
+    "items(added_at,"
+    "track(id,name,popularity,duration_ms,album(name),artists(id,name)))"
+)
+
+TRACK_COLUMNS = [
+    "track_id", "track_name", "base_name", "album_name", "artist_id", "artist_name",
+    "popularity", "duration_ms", "added_at", "playlist_name", "playlist_id",
+]
+
+ARTIST_COLUMNS = ["artist_id", "artist_name", "genres", "followers", "artist_popularity"]
+
+# Playlist membership lives in playlist_tracks; tracks.playlist_* only record the
+# playlist a track was first seen in, so they are left out of the fingerprint
+TRACK_HASH_COLUMNS = [c for c in TRACK_COLUMNS if c not in ("playlist_name", "playlist_id")]
+
+MEMBERSHIP_COLUMNS = ["track_id", "added_at"]
+
+# Version suffixes stripped to get a song's base name, e.g.
+# "Dynamite (Tropical Remix) - Japanese ver." -> "Dynamite"
+SONG_KEY_PATTERN = re.compile(
+    r"\s*\(.*?\)"
+    r"|- (?:Japanese ver\.?"
+    r"|Instrumental"
+    r"|Remix"
+    r"|\w+ Ver\.?)",
+    re.IGNORECASE,
+)
+
+
+# ROW FINGERPRINT
+def add_row_hash(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Add a uint64 `row_hash` of the given columns, used by the loader to skip unchanged rows.
+
+    pandas' hash is value-based (categoricals hash like their values), so the
+    same row hashes identically across chunks and runs.
+    """
+    df["row_hash"] = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return df
+
+
+# SONG KEY
+@lru_cache(maxsize=SONG_KEY_CACHE_SIZE)
+def song_key(track_name: Optional[str]) -> Optional[str]:
+    """Normalized song name shared by every version of a track (LRU-memoized)."""
+    if track_name is None:
+        return None
+    # Every suffix the pattern strips contains "(" or "-"
+    if "(" not in track_name and "-" not in track_name:
+        return track_name.strip()
+    return SONG_KEY_PATTERN.sub("", track_name).strip()
+
+
+def song_keys(names: np.ndarray) -> np.ndarray:
+    """song_key over an array of names, called once per distinct name."""
+    # A playlist repeats each song across its versions, so factorize first and
+    # look up only the uniques in the memo; code -1 (missing name) takes the None slot
+    codes, uniques = pd.factorize(names)
+    keys = np.empty(len(uniques) + 1, dtype=object)
+    keys[:-1] = [song_key(n) for n in uniques]
+    return keys[codes]
+
+
+# INCREMENTAL FILTER
+def filter_new_items(raw_items: Iterable[Dict[str, Any]],
+                     since: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Yield only items added after the `since` watermark (normalized added_at)."""
+    for item in raw_items:
+        added_at = (item.get("added_at") or "").replace("Z", "")
+        if since and added_at <= since:
+            continue
+        yield item
+
+
+# PLAYLIST MEMBERSHIP
+def tee_membership(raw_items: Iterable[Dict[str, Any]], members: list) -> Iterator[Dict[str, Any]]:
+    """Pass items through unchanged, appending (track_id, added_at) for each one to members.
+
+    Applied before the incremental filter, so members ends up holding the
+    playlist's full current track list (ids only) for the membership sync.
+    """
+    for item in raw_items:
+        track = item.get("track")
+        if track and track.get("id"):
+            members.append((track["id"], item.get("added_at")))
+        yield item
+
+
+def membership_frame(members) -> pd.DataFrame:
+    """(track_id, added_at) pairs as a frame, keeping each track's first occurrence."""
+    track_ids = np.array([m[0] for m in members], dtype=object)
+    added_at = np.array([m[1] for m in members], dtype=object)
+    df = pd.DataFrame({
+        "track_id": track_ids,
+        "added_at": _parse_added_at(added_at).astype("datetime64[s]"),
+    }, columns=MEMBERSHIP_COLUMNS)
+    return df.drop_duplicates("track_id").reset_index(drop=True)
 
 
 # NORMALIZE TRACKS
-def normalize_tracks(raw_items: List[Dict[str, Any]],
-                     playlist_name: str,
-                     playlist_id: str) -> pd.DataFrame:
+ADDED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
 
-    rows = []
+def _parse_added_at(values: np.ndarray) -> np.ndarray:
+    """Parse Spotify's 'YYYY-MM-DDTHH:MM:SSZ' timestamps into naive UTC datetime64."""
+    if pa is not None:
+        # Fast path: one strict C pass; anything not in Spotify's format falls through
+        try:
+            parsed = pc.strptime(pa.array(values, type=pa.string()), format=ADDED_AT_FORMAT, unit="s")
+            return parsed.to_numpy(zero_copy_only=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    stripped = [v[:-1] if v and v[-1] == "Z" else v for v in values]
+    try:
+        # numpy parses plain 'YYYY-MM-DDTHH:MM:SS' text itself
+        if all(v is None or len(v) == 19 for v in stripped):
+            return np.array(stripped, dtype="datetime64[s]")
+    except ValueError:
+        pass
+    # Offsets or other variants; let pandas normalize them to UTC
+    return pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601", utc=True) \
+        .dt.tz_localize(None).to_numpy()
+
+
+def _track_fields(raw_items: Iterable[Dict[str, Any]]) -> Tuple[list, ...]:
+    """Field lists in a single streaming pass, tolerating missing fields."""
+    track_ids, track_names, album_names = [], [], []
+    artist_ids, artist_names = [], []
+    popularity, duration_ms, added_at = [], [], []
 
     for item in raw_items:
         track = item.get("track")
         if not track:
             continue
 
-        artist = track["artists"][0] if track.get("artists") else {}
-
-        rows.append({
-            "track_id": track.get("id"),
-            "track_name": track.get("name"),
-            "album_name": track.get("album", {}).get("name"),
-            "artist_id": artist.get("id"),
-            "artist_name": artist.get("name"),
-            "popularity": track.get("popularity"),
-            "duration_ms": track.get("duration_ms"),
-            "added_at": item.get("added_at").replace("Z", ""),
-            "playlist_name": playlist_name,
-            "playlist_id": playlist_id,
-        })
+        artists = track.get("artists")
+        artist = artists[0] if artists else {}
+
+        track_ids.append(track.get("id"))
+        track_names.append(track.get("name"))
+        album_names.append((track.get("album") or {}).get("name"))
+        artist_ids.append(artist.get("id"))
+        artist_names.append(artist.get("name"))
+        popularity.append(track.get("popularity"))
+        duration_ms.append(track.get("duration_ms"))
+        added_at.append(item.get("added_at"))
+
+    return track_ids, track_names, album_names, artist_ids, artist_names, popularity, duration_ms, added_at
+
+
+def normalize_tracks(raw_items: Iterable[Dict[str, Any]],
+                     playlist_name: str,
+                     playlist_id: str) -> pd.DataFrame:
+    """Flatten raw playlist items straight into column arrays.
+
+    Items are consumed in a single streaming pass (no per-row dict), so raw
+    payloads are never held. Timestamps are parsed and duplicate track_ids
+    dropped on the arrays before the frame is built.
+    """
+    track_ids, track_names, album_names, artist_ids, artist_names, popularity, duration_ms, added_at = \
+        _track_fields(raw_items)
+
+    if len(set(track_ids)) < len(track_ids):
+        keep = ~pd.Index(track_ids, dtype=object).duplicated()
+    else:
+        keep = slice(None)
+
+    def col(values):
+        return np.array(values, dtype=object)[keep]
+
+    names = col(track_names)
+
+    return pd.DataFrame({
+        "track_id": col(track_ids),
+        "track_name": names,
+        "base_name": song_keys(names),
+        "album_name": col(album_names),
+        "artist_id": col(artist_ids),
+        "artist_name": col(artist_names),
+        "popularity": pd.to_numeric(col(popularity)),
+        "duration_ms": pd.to_numeric(col(duration_ms)),
+        "added_at": _parse_added_at(col(added_at)),
+        "playlist_name": playlist_name,
+        "playlist_id": playlist_id,
+    }, columns=TRACK_COLUMNS)
 
-    df = pd.DataFrame(rows).drop_duplicates(subset=["track_id"])
-    return df
 
 # NORMALIZE ARTISTS
 def normalize_artists(track_df: pd.DataFrame) -> pd.DataFrame:
@@ -44,34 +213,94 @@ def normalize_artists(track_df: pd.DataFrame) -> pd.DataFrame:
 
 
 # ARTIST ENRICHMENT
-def enrich_artists(artists_df: pd.DataFrame, client) -> pd.DataFrame:
-    """Fetch genres, followers, popularity for each unique artist."""
-    enriched_rows = []
+def enrich_artists(artists_df: pd.DataFrame, client, artist_cache=None) -> pd.DataFrame:
+    """Fetch genres, followers, popularity for each unique artist.
+
+    With an artist_cache, only missing or stale artists are requested from the API.
+    """
+    # Local files have no artist id; keep them as None rather than NaN
+    artist_ids = [a if pd.notna(a) else None for a in artists_df["artist_id"]]
 
-    for _, row in artists_df.iterrows():
-        artist_id = row["artist_id"]
+    if artist_cache is None:
+        details_list = client.get_artists(artist_ids)
+    else:
+        cached = artist_cache.get_many(artist_ids)
+        missing = [a for a in dict.fromkeys(artist_ids) if a and a not in cached]
+        fetched = dict(zip(missing, client.get_artists(missing)))
+        artist_cache.put_many({a: d for a, d in fetched.items() if d})
+        cached.update(fetched)
+        details_list = [cached.get(a, {}) for a in artist_ids]
 
-        details = client.get_artist(artist_id)
+    enriched_rows = []
 
+    for artist_id, artist_name, details in zip(
+        artist_ids, artists_df["artist_name"], details_list
+    ):
         enriched_rows.append({
             "artist_id": artist_id,
-            "artist_name": row["artist_name"],
+            "artist_name": artist_name,
             "genres": ", ".join(details.get("genres", [])),
             "followers": details.get("followers", {}).get("total"),
             "artist_popularity": details.get("popularity"),
         })
 
-    return pd.DataFrame(enriched_rows)
+    return pd.DataFrame(enriched_rows, columns=ARTIST_COLUMNS)
 
 
 # MAIN TRANSFORM PIPELINE
-def transform(raw_tracks: List[Dict[str, Any]],
+def transform(raw_tracks: Iterable[Dict[str, Any]],
               playlist_name: str,
               playlist_id: str,
-              client):
+              client,
+              artist_cache=None):
 
     tracks_df = normalize_tracks(raw_tracks, playlist_name, playlist_id)
     artists_df = normalize_artists(tracks_df)
-    artists_df = enrich_artists(artists_df, client)
+    artists_df = enrich_artists(artists_df, client, artist_cache)
+
+    return finalize_frames(tracks_df, artists_df)
 
+
+def finalize_frames(tracks_df: pd.DataFrame, artists_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Apply the output dtypes and add the row fingerprints the loader diffs against."""
+    tracks_df = add_row_hash(apply_schema(tracks_df, TRACK_DTYPES), TRACK_HASH_COLUMNS)
+    artists_df = add_row_hash(apply_schema(artists_df, ARTIST_DTYPES), ARTIST_COLUMNS)
     return tracks_df, artists_df
+
+
+# CHUNKED TRANSFORM PIPELINE
+def transform_chunks(raw_tracks: Iterable[Dict[str, Any]],
+                     playlist_name: str,
+                     playlist_id: str,
+                     client,
+                     artist_cache=None,
+                     chunk_size: int = TRANSFORM_CHUNK_SIZE) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Transform raw items in fixed-size batches, yielding (tracks, artists) chunks.
+
+    Only the seen track and artist ids are kept between chunks (a set of short
+    strings, not whole frames), so peak memory is bounded by chunk_size no
+    matter how large the playlist is. Each artists chunk holds only artists
+    first seen in that chunk, already enriched.
+    """
+    seen_tracks = set()
+    seen_artists = set()
+    items = iter(raw_tracks)
+
+    while True:
+        batch = list(islice(items, chunk_size))
+        if not batch:
+            break
+
+        tracks_df = normalize_tracks(batch, playlist_name, playlist_id)
+        del batch
+
+        new_tracks = ~tracks_df["track_id"].isin(seen_tracks)
+        tracks_df = tracks_df[new_tracks]
+        seen_tracks.update(tracks_df["track_id"])
+
+        artists_df = normalize_artists(tracks_df)
+        artists_df = artists_df[~artists_df["artist_id"].isin(seen_artists)]
+        seen_artists.update(artists_df["artist_id"])
+        artists_df = enrich_artists(artists_df, client, artist_cache)
+
+        yield finalize_frames(tracks_df, artists_df)
@@ -1,17 +1,5 @@
-import os
 import pandas as pd
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
-
-load_dotenv()
-
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
-MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
-MYSQL_DB = os.getenv("MYSQL_DB", "spotify_bts")
-
-DB_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+from etl.db import get_engine
 
 def export_table(engine, table, path):
     df = pd.read_sql(f"SELECT * FROM {table}", engine)
@@ -20,7 +8,7 @@ def export_table(engine, table, path):
     print(f"Saved {table} -> {path} ({len(df)} rows)")
 
 def main():
-    engine = create_engine(DB_URL)
+    engine = get_engine()
     export_table(engine, "tracks", Path("data/tracks.csv"))
     export_table(engine, "artists", Path("data/artists.csv"))
 
@@ -0,0 +1,53 @@
+-- Schema v2: typed columns and secondary indexes.
+-- Applied by `python -m etl.migrate` on top of the schema.sql baseline.
+-- Every step is guarded or idempotent, so the migration can be re-run after a
+-- partial failure (see etl/migrate.py).
+
+-- Catch up with the baseline: columns and tables the ETL relies on that
+-- existing databases were never given (base_name, row fingerprints, etl_state)
+-- skip-if: column tracks.base_name
+ALTER TABLE tracks ADD COLUMN base_name VARCHAR(255) AFTER track_name;
+
+-- skip-if: column tracks.row_hash
+ALTER TABLE tracks ADD COLUMN row_hash BIGINT UNSIGNED AFTER playlist_id;
+
+-- skip-if: column artists.row_hash
+ALTER TABLE artists ADD COLUMN row_hash BIGINT UNSIGNED AFTER artist_popularity;
+
+CREATE TABLE IF NOT EXISTS etl_state (
+    playlist_id VARCHAR(50) PRIMARY KEY,
+    snapshot_id VARCHAR(100),
+    last_added_at VARCHAR(30),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Normalize legacy ISO strings ('2020-01-01T00:00:00Z', '...+00:00') so they
+-- convert cleanly to DATETIME (values are already UTC). Skipped once added_at
+-- is a DATETIME: strict mode rejects comparing it with ''.
+-- skip-if: column_type tracks.added_at datetime
+UPDATE tracks
+SET added_at = LEFT(REPLACE(added_at, 'T', ' '), 19)
+WHERE added_at IS NOT NULL AND added_at <> LEFT(REPLACE(added_at, 'T', ' '), 19);
+
+-- skip-if: column_type tracks.added_at datetime
+UPDATE tracks SET added_at = NULL WHERE added_at = '';
+
+-- One table rebuild for both column type changes
+-- skip-if: column_type tracks.added_at datetime
+-- skip-if: column_type tracks.popularity tinyint unsigned
+ALTER TABLE tracks
+    MODIFY added_at DATETIME NULL,
+    MODIFY popularity TINYINT UNSIGNED NULL;
+
+-- InnoDB adds secondary indexes in place, without another rebuild
+-- skip-if: index tracks.idx_tracks_artist_id
+ALTER TABLE tracks ADD INDEX idx_tracks_artist_id (artist_id);
+
+-- skip-if: index tracks.idx_tracks_playlist_added
+ALTER TABLE tracks ADD INDEX idx_tracks_playlist_added (playlist_id, added_at);
+
+-- skip-if: index tracks.idx_tracks_base_name
+ALTER TABLE tracks ADD INDEX idx_tracks_base_name (base_name);
+
+-- skip-if: column_type artists.artist_popularity tinyint unsigned
+ALTER TABLE artists MODIFY artist_popularity TINYINT UNSIGNED NULL;
@@ -0,0 +1,18 @@
+-- Append-only daily popularity history for tracks and artists.
+-- Range-partitioned by month so old months can be dropped instantly with
+-- `python -m etl.snapshots prune`. Only the catch-all partition is created
+-- here; the loader splits monthly partitions off it ahead of time.
+
+CREATE TABLE IF NOT EXISTS popularity_snapshots (
+    snapshot_date DATE NOT NULL,
+    entity_type ENUM('track', 'artist') NOT NULL,
+    entity_id VARCHAR(50) NOT NULL,
+    popularity TINYINT UNSIGNED,
+    followers INT UNSIGNED,
+
+    -- The partitioning column must be part of every unique key
+    PRIMARY KEY (entity_type, entity_id, snapshot_date)
+)
+PARTITION BY RANGE COLUMNS (snapshot_date) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,18 @@
+-- Playlist membership bridge table. A track can belong to any number of
+-- playlists; tracks.playlist_id/playlist_name now only record the first one.
+
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id VARCHAR(50) NOT NULL,
+    track_id VARCHAR(50) NOT NULL,
+    added_at DATETIME,
+
+    -- Per-playlist scans use the primary key; this serves "which playlists is a track in"
+    PRIMARY KEY (playlist_id, track_id),
+    INDEX idx_playlist_tracks_track_id (track_id)
+);
+
+-- Backfill from the one playlist recorded on each track so far
+INSERT IGNORE INTO playlist_tracks (playlist_id, track_id, added_at)
+SELECT playlist_id, track_id, added_at
+FROM tracks
+WHERE playlist_id IS NOT NULL;
@@ -1,4 +1,5 @@
 -- DATABASE SETUP
+-- This is the baseline schema. Apply later versions with: python -m etl.migrate
 CREATE DATABASE IF NOT EXISTS spotify_bts;
 USE spotify_bts;
 
@@ -18,6 +19,7 @@ CREATE TABLE IF NOT EXISTS tracks (
     track_name VARCHAR(255) NOT NULL,
     album_name VARCHAR(255),
     artist_id VARCHAR(50),
+    artist_name VARCHAR(255),
     popularity INT,
     duration_ms INT,
     
@@ -31,3 +33,4 @@ CREATE TABLE IF NOT EXISTS tracks (
 
     FOREIGN KEY (artist_id) REFERENCES artists(artist_id)
 );
+
@@ -0,0 +1,49 @@
+# tests/conftest.py
+#
+# Shared fixtures: a local fake Spotify API (etl/fake_spotify.py) and clients
+# pointed at it, so no network access or real credentials are needed.
+
+import pytest
+from etl.fake_spotify import FakeSpotifyState, generate_dataset, start_server, server_urls
+from etl.rate_limiter import RateLimiter
+from etl.spotify_client import SpotifyClient
+
+PLAYLIST_ID = "testplaylist0000000000"
+
+
+@pytest.fixture
+def fake_api():
+    """Start a fake API server; returns a function taking FakeSpotifyState options."""
+    servers = []
+
+    def start(n_tracks=250, n_artists=60, **options):
+        state = FakeSpotifyState(generate_dataset(n_tracks, n_artists, playlist_id=PLAYLIST_ID), **options)
+        server = start_server(state)
+        servers.append(server)
+        return state, server_urls(server)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def make_client():
+    """Build SpotifyClients against a fake server, with no token cache on disk."""
+    clients = []
+
+    def make(urls, limiter=None):
+        client = SpotifyClient(
+            rate_limiter=limiter or RateLimiter(rate=1000, burst=100),
+            client_id="test-client",
+            client_secret="test-secret",
+        )
+        client.token_url = urls["token_url"]
+        client.api_base = urls["api_base"]
+        client.tokens.cache_path = None
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
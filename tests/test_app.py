@@ -0,0 +1,62 @@
+# tests/test_app.py
+
+import subprocess
+import sys
+import pandas as pd
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+import app
+from etl.fake_spotify import generate_dataset
+from etl.storage import DuckDBBackend
+from etl.transform import normalize_tracks, normalize_artists, finalize_frames
+
+PLAYLIST_ID = "testplaylist0000000000"
+
+
+@pytest.fixture
+def duckdb_path(tmp_path):
+    items = generate_dataset(300, 40, playlist_id=PLAYLIST_ID)["playlists"][PLAYLIST_ID]["items"]
+    for item, name in zip(items[:30], ["BTS", "Jung Kook", "j-hope"] * 10):
+        item["track"]["artists"][0]["name"] = name
+    tracks = normalize_tracks(items, "bts_all_songs", PLAYLIST_ID)
+    path = str(tmp_path / "spotify.duckdb")
+    backend = DuckDBBackend(path)
+    backend.load(*finalize_frames(tracks, normalize_artists(tracks)))
+    backend.close()
+    return path
+
+
+def test_sql_aggregates_match_the_csv_path(duckdb_path):
+    backend = DuckDBBackend(duckdb_path, read_only=True)
+    sql = app.aggregate_sql(backend)
+    # What the CSV path sees: the stored tables, read back through apply_schema
+    tracks, artists = (app.apply_schema(backend.query(f"SELECT * FROM {t}"), dtypes)
+                       for t, dtypes in (("tracks", app.TRACK_DTYPES), ("artists", app.ARTIST_DTYPES)))
+    backend.close()
+    frames = app.aggregate_frames(tracks, artists)
+
+    assert sql["summary"]["bts_tracks"] == 30
+    assert sql["summary"].keys() == frames["summary"].keys()
+    for key, value in frames["summary"].items():
+        assert sql["summary"][key] == pytest.approx(value), key
+    for name in ("songs", "artists", "popularity", "duration"):
+        pd.testing.assert_frame_equal(sql[name], frames[name], check_dtype=False, check_exact=False, obj=name)
+
+
+def test_locked_file_falls_back_to_the_csvs(duckdb_path, monkeypatch):
+    monkeypatch.setattr(app, "DUCKDB_PATH", app.Path(duckdb_path))
+    # A second process holding the file for writing, as a running ETL does
+    writer = subprocess.Popen(
+        [sys.executable, "-c",
+         f"import duckdb, sys; c = duckdb.connect({duckdb_path!r}); print('ready', flush=True); sys.stdin.read()"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+        assert app._duckdb_stats() is None
+    finally:
+        writer.communicate("")
+
+    assert app._duckdb_stats()["summary"]["total_tracks"] == 300
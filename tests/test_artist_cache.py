@@ -0,0 +1,57 @@
+# tests/test_artist_cache.py
+
+from types import SimpleNamespace
+import pytest
+from etl import artist_cache
+from etl.artist_cache import ArtistCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(artist_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def details(popularity):
+    return {"id": "ignored", "genres": ["k-pop"], "followers": {"href": None, "total": 10}, "popularity": popularity}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ArtistCache(":memory:", ttl=100)
+    cache.put_many({"a": details(50)})
+
+    clock.value += 99
+    assert cache.get_many(["a", "b", None]) == {
+        "a": {"genres": ["k-pop"], "followers": {"total": 10}, "popularity": 50},
+    }
+    clock.value += 1
+    assert cache.get_many(["a"]) == {}
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = ArtistCache(":memory:", max_entries=2)
+    cache.put_many({"a": details(1)})
+    clock.value += 1
+    cache.put_many({"b": details(2)})
+    clock.value += 1
+    cache.get_many(["a"])   # a is now more recently used than b
+    clock.value += 1
+
+    cache.put_many({"c": details(3)})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    cache.close()
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "artists.sqlite")
+    cache = ArtistCache(path)
+    cache.put_many({"a": details(7)})
+    cache.close()
+
+    cache = ArtistCache(path)
+    assert cache.get_many(["a"])["a"]["popularity"] == 7
+    cache.close()
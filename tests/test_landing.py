@@ -0,0 +1,156 @@
+# tests/test_landing.py
+
+import json
+import sys
+import pytest
+from etl import fake_spotify, landing as landing_module, run_etl
+from etl.artist_cache import ArtistCache
+from etl.fake_spotify import FakeSpotifyState, dataset_from_landing, start_server, server_urls
+from etl.landing import LandingWriter, iter_landed_items, latest_run_id, missing_fields, read_meta
+from etl.storage import SQLiteBackend
+from etl.transform import PLAYLIST_ITEM_FIELDS
+
+PLAYLIST_ID = "testplaylist0000000000"   # see conftest.fake_api
+
+
+def test_missing_fields():
+    assert missing_fields(None, PLAYLIST_ITEM_FIELDS) == []
+    assert missing_fields(PLAYLIST_ITEM_FIELDS, PLAYLIST_ITEM_FIELDS) == []
+    assert missing_fields("items", PLAYLIST_ITEM_FIELDS) == []
+    assert missing_fields("items(added_at,track(id,name,album,artists(id,name)))", PLAYLIST_ITEM_FIELDS) == [
+        "items.track.popularity", "items.track.duration_ms",
+    ]
+    # album(name) does not cover a request for the whole album
+    assert missing_fields("items(track(album(name)))", "items(track(album))") == ["items.track.album"]
+
+
+def test_landed_pages_are_unprojected_by_default(fake_api, make_client, tmp_path):
+    state, urls = fake_api(n_tracks=250)
+    client = make_client(urls)
+
+    landing = LandingWriter(PLAYLIST_ID, "bts_all_songs", base_dir=str(tmp_path))
+    for _ in landing.tee_pages(client.iter_pages(PLAYLIST_ID, fields=landing.fields)):
+        pass
+    landing.finish(snapshot_id="snap")
+
+    meta = read_meta(PLAYLIST_ID, landing.run_id, str(tmp_path))
+    assert meta["fields"] is None
+    assert (meta["pages"], meta["items"]) == (3, 250)
+    assert list(iter_landed_items(PLAYLIST_ID, landing.run_id, str(tmp_path))) == \
+        state.dataset["playlists"][PLAYLIST_ID]["items"]
+
+
+def test_replay_warns_about_a_narrow_landed_projection(fake_api, make_client, tmp_path, monkeypatch, capsys):
+    state, urls = fake_api(n_tracks=20)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_etl, "DEFAULT_PLAYLIST_ID", PLAYLIST_ID)
+    monkeypatch.setattr(run_etl, "SpotifyClient", lambda: make_client(urls))
+
+    landing = LandingWriter(PLAYLIST_ID, "bts_all_songs", fields="items(added_at,track(id,name))")
+    landing.write_page(state.dataset["playlists"][PLAYLIST_ID])
+    landing.finish(snapshot_id="snap")
+    assert latest_run_id(PLAYLIST_ID) == landing.run_id
+
+    run_etl.replay(backend=SQLiteBackend(str(tmp_path / "etl.sqlite")))
+
+    out = capsys.readouterr().out
+    assert "lacks items.track.popularity, items.track.duration_ms, items.track.album, items.track.artists" in out
+    assert json.loads((landing.dir / "_meta.json").read_text())["fields"] == "items(added_at,track(id,name))"
+
+
+def land(items, run_id, base_dir="landing", page_size=100):
+    writer = LandingWriter(PLAYLIST_ID, "bts_all_songs", run_id=run_id, base_dir=base_dir)
+    for start in range(0, len(items), page_size):
+        writer.write_page({"items": items[start:start + page_size]})
+    writer.finish(snapshot_id=f"snap-{run_id}")
+    return writer
+
+
+def test_unfinished_runs_are_not_replayable(tmp_path):
+    writer = LandingWriter(PLAYLIST_ID, "bts_all_songs", run_id="20240101T000000Z", base_dir=str(tmp_path))
+    writer.write_page({"items": [{"added_at": None, "track": None}]})
+
+    assert latest_run_id(PLAYLIST_ID, str(tmp_path)) is None
+    with pytest.raises(FileNotFoundError):
+        list(iter_landed_items(PLAYLIST_ID, writer.run_id, str(tmp_path)))
+
+
+def test_zstd_parts_need_zstandard(tmp_path, monkeypatch):
+    writer = land([{"added_at": None, "track": None}], "20240101T000000Z", str(tmp_path))
+    (writer.dir / "part-00001.ndjson.zst").write_bytes(b"")
+    monkeypatch.setattr(landing_module, "zstandard", None)
+
+    with pytest.raises(RuntimeError, match="install zstandard"):
+        list(iter_landed_items(PLAYLIST_ID, writer.run_id, str(tmp_path)))
+
+
+def test_replay_loads_a_landed_run_and_syncs_membership_only_for_the_latest(
+        fake_api, make_client, tmp_path, monkeypatch, capsys):
+    state, urls = fake_api(n_tracks=150)
+    items = state.dataset["playlists"][PLAYLIST_ID]["items"]
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_etl, "DEFAULT_PLAYLIST_ID", PLAYLIST_ID)
+    monkeypatch.setattr(run_etl, "SpotifyClient", lambda: make_client(urls))
+    db_path = str(tmp_path / "etl.sqlite")
+    land(items, "20240301T020000Z")
+    land(items[:100], "20240302T020000Z")
+
+    run_etl.replay("20240301T020000Z", backend=SQLiteBackend(db_path))
+
+    backend = SQLiteBackend(db_path)
+    assert backend.query("SELECT COUNT(*) AS n FROM tracks").iloc[0, 0] == 150
+    assert backend.query("SELECT COUNT(*) AS n FROM playlist_tracks").iloc[0, 0] == 0
+    dates = backend.query("SELECT DISTINCT snapshot_date FROM popularity_snapshots")["snapshot_date"]
+    assert dates.tolist() == ["2024-03-01"]
+    assert "older than the latest run 20240302T020000Z" in capsys.readouterr().out
+
+    run_etl.replay(backend=backend)
+
+    backend = SQLiteBackend(db_path)
+    assert backend.query("SELECT COUNT(*) AS n FROM playlist_tracks").iloc[0, 0] == 100
+    backend.close()
+
+
+@pytest.fixture
+def recorded(fake_api, tmp_path):
+    """A landed run of the fake playlist, plus an artist cache holding one of its artists."""
+    state, _ = fake_api(n_tracks=130, n_artists=10)
+    land(state.dataset["playlists"][PLAYLIST_ID]["items"], "20240301T020000Z", str(tmp_path / "landing"))
+    cached_id, cached = next(iter(state.dataset["artists"].items()))
+    cache = ArtistCache(str(tmp_path / ".cache" / "artists.sqlite"))
+    cache.put_many({cached_id: cached})
+    cache.close()
+    return state, cached_id
+
+
+def test_recorded_dataset_serves_the_landed_run(recorded, make_client, tmp_path):
+    state, cached_id = recorded
+
+    dataset = dataset_from_landing([(PLAYLIST_ID, None)], str(tmp_path / "landing"),
+                                   str(tmp_path / ".cache" / "artists.sqlite"))
+
+    live = state.dataset["artists"]
+    assert dataset["artists"][cached_id] == live[cached_id]
+    other_id = next(a for a in dataset["artists"] if a != cached_id)
+    assert dataset["artists"][other_id]["name"] == live[other_id]["name"]
+    assert dataset["artists"][other_id]["popularity"] is None
+
+    server = start_server(FakeSpotifyState(dataset))
+    try:
+        client = make_client(server_urls(server))
+        assert client.get_playlist_tracks(PLAYLIST_ID) == state.dataset["playlists"][PLAYLIST_ID]["items"]
+        assert client.get_playlist_snapshot_id(PLAYLIST_ID) == "snap-20240301T020000Z"
+    finally:
+        server.shutdown()
+
+
+def test_record_writes_a_data_file(recorded, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["fake_spotify", "record", "--landed", f"{PLAYLIST_ID}:20240301T020000Z",
+                                      "--out", "recorded.json"])
+
+    fake_spotify.main()
+
+    data = json.loads((tmp_path / "recorded.json").read_text())
+    assert data == dataset_from_landing([(PLAYLIST_ID, "20240301T020000Z")])
+    assert len(data["playlists"][PLAYLIST_ID]["items"]) == 130
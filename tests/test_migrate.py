@@ -0,0 +1,67 @@
+# tests/test_migrate.py
+
+import re
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from etl import migrate
+
+# SQLite stand-ins for the information_schema checks, for the re-run test
+SQLITE_GUARD_QUERIES = {
+    "column": "SELECT COUNT(*) FROM pragma_table_info(:table) WHERE name = :name",
+    "index": "SELECT COUNT(*) FROM pragma_index_list(:table) WHERE name = :name",
+    "column_type": "SELECT COUNT(*) FROM pragma_table_info(:table) WHERE name = :name AND lower(type) = :type",
+}
+
+
+def test_every_schema_change_in_0001_is_guarded():
+    version, name, path = migrate.discover()[0]
+    statements = migrate.parse_migration(path.read_text(encoding="utf-8"))
+
+    for guards, stmt in statements:
+        if re.search(r"\b(ADD|MODIFY)\b", stmt):
+            assert guards, stmt
+    assert statements[0] == ([("column", "tracks", "base_name", "")],
+                             "ALTER TABLE tracks ADD COLUMN base_name VARCHAR(255) AFTER track_name")
+
+
+def test_comments_with_semicolons_do_not_split_statements():
+    sql = "-- one; two\nCREATE TABLE a (x INT);\n-- skip-if: index a.idx_x\nCREATE INDEX idx_x ON a (x);"
+
+    assert migrate.parse_migration(sql) == [
+        ([], "CREATE TABLE a (x INT)"),
+        ([("index", "a", "idx_x", "")], "CREATE INDEX idx_x ON a (x)"),
+    ]
+
+
+@pytest.mark.parametrize("line", ["-- skip-if: table tracks", "-- skip-if: column_type tracks.added_at"])
+def test_bad_guards_are_rejected(line):
+    with pytest.raises(ValueError):
+        migrate.parse_migration(f"{line}\nSELECT 1;")
+
+
+def test_rerun_after_a_partial_failure_skips_completed_steps(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(migrate, "GUARD_QUERIES", SQLITE_GUARD_QUERIES)
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE tracks (track_id TEXT PRIMARY KEY, artist_id TEXT)"))
+
+    steps = (
+        "-- skip-if: column tracks.base_name\nALTER TABLE tracks ADD COLUMN base_name TEXT;\n"
+        "-- skip-if: index tracks.idx_tracks_artist_id\nCREATE INDEX idx_tracks_artist_id ON tracks (artist_id);\n"
+    )
+    (tmp_path / "0001_steps.sql").write_text(steps + "ALTER TABLE missing_table ADD COLUMN x TEXT;\n")
+    with pytest.raises(Exception, match="missing_table"):
+        migrate.migrate(engine, tmp_path)
+    assert migrate.applied_versions(engine) == set()
+
+    # Like MySQL DDL, the completed steps were not rolled back
+    assert "base_name" in [c["name"] for c in inspect(engine).get_columns("tracks")]
+    capsys.readouterr()
+
+    (tmp_path / "0001_steps.sql").write_text(steps)
+    assert migrate.migrate(engine, tmp_path) == [1]
+    assert capsys.readouterr().out.count("already applied") == 2
+
+    columns = [c["name"] for c in inspect(engine).get_columns("tracks")]
+    assert columns == ["track_id", "artist_id", "base_name"]
+    engine.dispose()
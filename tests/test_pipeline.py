@@ -0,0 +1,60 @@
+# tests/test_pipeline.py
+
+import threading
+import pytest
+from etl.pipeline import run_pipelined
+
+
+def doubled(items):
+    for x in items:
+        yield x * 2
+
+
+def test_outputs_match_sequential_order_and_stats_are_recorded():
+    stats = {}
+
+    out = list(run_pipelined(range(1000), [("double", doubled), ("inc", lambda xs: (x + 1 for x in xs))],
+                             queue_size=2, source_batch=7, stats=stats))
+
+    assert out == [x * 2 + 1 for x in range(1000)]
+    assert set(stats) == {"extract", "double", "inc"}
+
+
+@pytest.mark.parametrize("where", ["source", "stage"])
+def test_an_exception_in_any_stage_reaches_the_consumer(where):
+    def source():
+        yield from range(10)
+        if where == "source":
+            raise ValueError("source failed")
+
+    def stage(items):
+        for x in items:
+            if where == "stage" and x == 5:
+                raise ValueError("stage failed")
+            yield x
+
+    received = []
+    with pytest.raises(ValueError, match=f"{where} failed"):
+        for x in run_pipelined(source(), [("stage", stage)], source_batch=1):
+            received.append(x)
+    assert received == list(range(5 if where == "stage" else 10))
+
+
+def test_closing_early_cancels_blocked_stages():
+    produced = []
+
+    def endless():
+        n = 0
+        while True:
+            produced.append(n)
+            yield n
+            n += 1
+
+    before = threading.active_count()
+    out = run_pipelined(endless(), [("double", doubled)], queue_size=2, source_batch=1)
+    assert [next(out) for _ in range(3)] == [0, 2, 4]
+    out.close()
+
+    # Every stage thread has exited, and the source stopped at the bounded queues
+    assert threading.active_count() == before
+    assert len(produced) < 20
@@ -0,0 +1,62 @@
+# tests/test_run_many.py
+
+import pytest
+from etl import run_many
+from etl.landing import latest_run_id, read_meta
+from etl.storage import SQLiteBackend
+
+PLAYLIST_ID = "testplaylist0000000000"   # see conftest.fake_api
+SECOND_ID = "secondplaylist00000000"
+
+
+@pytest.fixture
+def env(fake_api, make_client, tmp_path, monkeypatch):
+    """Fake API with two overlapping playlists; landing and artist cache under tmp_path."""
+    state, urls = fake_api(n_tracks=120, n_artists=20)
+    items = state.dataset["playlists"][PLAYLIST_ID]["items"]
+    state.dataset["playlists"][SECOND_ID] = {"name": "Second", "snapshot_id": "s-1", "items": items[100:] + items[:10]}
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_many, "SpotifyClient", lambda: make_client(urls))
+    return state, str(tmp_path / "etl.sqlite")
+
+
+def run(db_path, playlists, **kwargs):
+    run_many.main(playlists, backend=SQLiteBackend(db_path), workers=2, **kwargs)
+    return SQLiteBackend(db_path)
+
+
+def test_playlists_are_loaded_once_with_membership_per_playlist(env, capsys):
+    state, db_path = env
+    playlists = [{"id": PLAYLIST_ID, "name": "bts_all_songs"}, {"id": SECOND_ID, "name": None},
+                 {"id": "missingplaylist0000000", "name": None}]
+
+    backend = run(db_path, playlists)
+
+    counts = backend.query("SELECT playlist_id, COUNT(*) AS n FROM playlist_tracks GROUP BY playlist_id")
+    assert dict(zip(counts["playlist_id"], counts["n"])) == {PLAYLIST_ID: 120, SECOND_ID: 30}
+    assert backend.query("SELECT COUNT(*) AS n FROM tracks").iloc[0, 0] == 120
+    artist_ids = {i["track"]["artists"][0]["id"] for i in state.dataset["playlists"][PLAYLIST_ID]["items"]}
+    assert backend.query("SELECT COUNT(*) AS n FROM artists").iloc[0, 0] == len(artist_ids)
+    assert backend.get_playlist_state(SECOND_ID)[0] == "s-1"
+    assert read_meta(SECOND_ID, latest_run_id(SECOND_ID))["playlist_name"] == "Second"
+    assert "missingplaylist0000000: FAILED" in capsys.readouterr().out
+    backend.close()
+
+
+def test_unchanged_playlists_are_skipped_and_new_items_picked_up(env, capsys):
+    state, db_path = env
+    playlists = [{"id": PLAYLIST_ID, "name": "bts_all_songs"}, {"id": SECOND_ID, "name": "Second"}]
+    run(db_path, playlists).close()
+    capsys.readouterr()
+
+    second = state.dataset["playlists"][SECOND_ID]
+    second["items"] = second["items"][:-5]
+    second["snapshot_id"] = "s-2"
+    backend = run(db_path, playlists)
+
+    out = capsys.readouterr().out
+    assert "bts_all_songs: unchanged" in out
+    # The watermark filters every item, but membership still sees the removals
+    assert "Second: 0 new items; membership +0 -5 (25 unchanged)" in out
+    assert backend.get_playlist_state(SECOND_ID)[0] == "s-2"
+    backend.close()
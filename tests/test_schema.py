@@ -0,0 +1,38 @@
+# tests/test_schema.py
+
+import numpy as np
+import pandas as pd
+from etl.schema import TRACK_DTYPES, ARTIST_DTYPES, apply_schema
+
+
+def test_csv_round_trip_gets_the_compact_dtypes(tmp_path):
+    # What pandas infers reading an export back: NaN-promoted floats and plain objects
+    raw = pd.DataFrame({
+        "track_id": ["t1", "t2", "t3"],
+        "track_name": ["Dynamite", "Butter", "IDOL"],
+        "base_name": ["Dynamite", "Butter", "IDOL"],
+        "album_name": ["BE", None, "LY"],
+        "artist_id": ["a1", "a1", "a2"],
+        "artist_name": ["BTS", "BTS", "BTS"],
+        "popularity": [100.0, np.nan, 0.0],
+        "duration_ms": [199054, 164441, 222000],
+        "added_at": ["2020-08-21 04:00:00", None, "2018-08-24 00:00:00"],
+        "playlist_name": ["p", "p", "p"],
+        "playlist_id": ["pid", "pid", "pid"],
+        "extra": [1, 2, 3],
+    })
+    raw.to_csv(tmp_path / "tracks.csv", index=False)
+
+    df = apply_schema(pd.read_csv(tmp_path / "tracks.csv"), TRACK_DTYPES)
+
+    assert {col: str(df[col].dtype) for col in TRACK_DTYPES} == TRACK_DTYPES
+    assert df["popularity"].tolist()[::2] == [100, 0] and df["popularity"].isna().tolist() == [False, True, False]
+    assert df["added_at"].iloc[0] == pd.Timestamp("2020-08-21 04:00:00")
+    assert df["extra"].dtype == np.int64
+
+
+def test_missing_columns_are_skipped():
+    df = apply_schema(pd.DataFrame({"artist_id": ["a1"], "followers": [12.0]}), ARTIST_DTYPES)
+
+    assert list(df.columns) == ["artist_id", "followers"]
+    assert str(df["followers"].dtype) == "Int32"
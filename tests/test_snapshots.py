@@ -0,0 +1,44 @@
+# tests/test_snapshots.py
+
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from etl.artist_cache import ArtistCache
+from etl.snapshots import choose_bucket, popularity_frames, snapshot_rows, SNAPSHOT_ITEM_FIELDS
+
+PLAYLIST_ID = "testplaylist0000000000"   # see conftest.fake_api
+
+
+def test_popularity_pass_reads_artists_from_the_api_and_refreshes_the_cache(fake_api, make_client):
+    state, urls = fake_api(n_tracks=120, n_artists=15)
+    client = make_client(urls)
+    artist_id, live = next(iter(state.dataset["artists"].items()))
+
+    cache = ArtistCache(":memory:")
+    cache.put_many({artist_id: {**live, "popularity": live["popularity"] // 2 + 1, "followers": {"total": 1}}})
+
+    items = client.iter_playlist_tracks(PLAYLIST_ID, fields=SNAPSHOT_ITEM_FIELDS)
+    tracks, artists = popularity_frames(items, client, cache)
+
+    assert len(tracks) == 120
+    row = artists.set_index("artist_id").loc[artist_id]
+    assert (row["artist_popularity"], row["followers"]) == (live["popularity"], live["followers"]["total"])
+    assert cache.get_many([artist_id])[artist_id]["popularity"] == live["popularity"]
+    cache.close()
+
+
+def test_snapshot_rows_without_artists_has_only_tracks():
+    tracks = pd.DataFrame({"track_id": ["a", "b", None], "popularity": [1, 2, 3]})
+
+    rows = snapshot_rows(tracks, snapshot_date=pd.Timestamp("2024-03-01").date())
+
+    assert rows["entity_type"].tolist() == ["track", "track"]
+    assert rows["snapshot_date"].iloc[0] == pd.Timestamp("2024-03-01")
+
+
+@pytest.mark.parametrize("days, bucket", [
+    (0, "day"), (120, "day"), (121, "week"), (7 * 120, "week"), (7 * 120 + 1, "month"),
+])
+def test_choose_bucket_boundaries(days, bucket):
+    start = date(2024, 1, 1)
+    assert choose_bucket(start, start + timedelta(days=days), max_points=120) == bucket
@@ -0,0 +1,76 @@
+# tests/test_spotify_client.py
+
+import pytest
+from etl.rate_limiter import RateLimiter
+from etl.spotify_client import SpotifyClientError
+
+PLAYLIST_ID = "testplaylist0000000000"   # see conftest.fake_api
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_pagination_returns_every_item_in_order(fake_api, make_client, concurrent):
+    # The server caps pages below the requested 100, like Spotify can
+    state, urls = fake_api(n_tracks=250, max_page_size=40)
+    client = make_client(urls)
+
+    items = client.get_playlist_tracks(PLAYLIST_ID, concurrent=concurrent, max_workers=4)
+
+    expected = state.dataset["playlists"][PLAYLIST_ID]["items"]
+    assert [i["track"]["id"] for i in items] == [i["track"]["id"] for i in expected]
+    assert state.requests == 1 + 7   # token + ceil(250 / 40) pages
+
+
+def test_429s_are_retried(fake_api, make_client):
+    state, urls = fake_api(n_tracks=300, error_rate=0.3, retry_after=0)
+    client = make_client(urls)
+
+    items = client.get_playlist_tracks(PLAYLIST_ID)
+
+    assert len(items) == 300
+    assert state.throttled > 0
+
+
+def test_429_backs_off_rate_and_concurrency():
+    limiter = RateLimiter(rate=20, burst=20, start_concurrency=8, min_concurrency=1, max_concurrency=16)
+
+    limiter.record(429)
+    assert limiter.rate == 10
+    assert limiter.limit == 4
+
+    for _ in range(limiter.limit):
+        limiter.record(200)
+    assert limiter.rate > 10
+    assert limiter.limit == 5
+
+
+def test_expired_token_is_refreshed_once(fake_api, make_client):
+    state, urls = fake_api()
+    client = make_client(urls)
+    client.authenticate()
+
+    state.expire_tokens()
+    meta = client.get_playlist_meta(PLAYLIST_ID)
+
+    assert meta["snapshot_id"] == "snap-1"
+    assert state.tokens_issued == 2
+
+
+def test_unknown_playlist_raises(fake_api, make_client):
+    _, urls = fake_api()
+    client = make_client(urls)
+
+    with pytest.raises(SpotifyClientError):
+        client.get_playlist_tracks("doesnotexist")
+
+
+def test_get_artists_batches_and_keeps_order(fake_api, make_client):
+    state, urls = fake_api(n_artists=120)
+    client = make_client(urls)
+    artist_ids = list(state.dataset["artists"])
+    requested = artist_ids[::-1] + [None, "unknownartist"]
+
+    details = client.get_artists(requested)
+
+    assert [d.get("id") for d in details[:-2]] == artist_ids[::-1]
+    assert details[-2:] == [{}, {}]
+    assert state.requests == 1 + 3   # token + ceil(120 / 50) batches
@@ -0,0 +1,158 @@
+# tests/test_storage.py
+
+from datetime import date
+import pandas as pd
+import pytest
+from etl.fake_spotify import generate_dataset
+from etl.storage import get_backend
+from etl.transform import normalize_tracks, normalize_artists, membership_frame, finalize_frames
+
+PLAYLIST_ID = "testplaylist0000000000"
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def backend(request, tmp_path):
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    backend = get_backend(request.param, str(tmp_path / f"etl.{request.param}"))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def items():
+    return generate_dataset(200, 30, playlist_id=PLAYLIST_ID)["playlists"][PLAYLIST_ID]["items"]
+
+
+def frames(items, playlist_name="bts_all_songs", playlist_id=PLAYLIST_ID):
+    tracks = normalize_tracks(items, playlist_name, playlist_id)
+    return finalize_frames(tracks, normalize_artists(tracks))
+
+
+def test_load_inserts_then_skips_unchanged_rows(backend, items):
+    tracks, artists = frames(items)
+
+    first = backend.load(tracks, artists)
+    second = backend.load(tracks, artists)
+
+    assert first["tracks"] == {"inserted": 200, "updated": 0, "unchanged": 0}
+    assert first["artists"]["inserted"] == len(artists)
+    assert second["tracks"] == {"inserted": 0, "updated": 0, "unchanged": 200}
+    assert second["artists"] == {"inserted": 0, "updated": 0, "unchanged": len(artists)}
+
+
+def test_load_updates_only_changed_rows(backend, items):
+    backend.load(*frames(items))
+
+    items[0]["track"]["popularity"] = (items[0]["track"]["popularity"] + 1) % 100
+    counts = backend.load(*frames(items))
+
+    assert counts["tracks"] == {"inserted": 0, "updated": 1, "unchanged": 199}
+    stored = backend.query(
+        "SELECT popularity FROM tracks WHERE track_id = $id", {"id": items[0]["track"]["id"]}
+    )
+    assert stored.iloc[0, 0] == items[0]["track"]["popularity"]
+
+
+def test_load_keeps_first_playlist_of_a_track(backend, items):
+    backend.load(*frames(items, "first", "first_id"))
+    counts = backend.load(*frames(items, "second", "second_id"))
+
+    # Playlist columns are insert-only and not part of the fingerprint
+    assert counts["tracks"]["unchanged"] == 200
+    assert backend.query("SELECT DISTINCT playlist_name FROM tracks")["playlist_name"].tolist() == ["first"]
+
+
+def test_playlist_state_round_trip(backend):
+    assert backend.get_playlist_state(PLAYLIST_ID) == (None, None)
+
+    backend.save_playlist_state(PLAYLIST_ID, "snap-1", "2020-01-01T00:00:00")
+    backend.save_playlist_state(PLAYLIST_ID, "snap-2", "2020-02-01T00:00:00")
+
+    assert backend.get_playlist_state(PLAYLIST_ID) == ("snap-2", "2020-02-01T00:00:00")
+
+
+def members_of(items):
+    return membership_frame([(i["track"]["id"], i["added_at"]) for i in items])
+
+
+def test_membership_sync_adds_updates_and_removes(backend, items):
+    first = backend.sync_playlist_tracks(PLAYLIST_ID, members_of(items[:150]))
+    assert first == {"added": 150, "updated": 0, "removed": 0, "unchanged": 0}
+
+    current = items[10:160]
+    current[0] = {**current[0], "added_at": "2024-05-05T05:05:05Z"}
+    second = backend.sync_playlist_tracks(PLAYLIST_ID, members_of(current))
+
+    assert second == {"added": 10, "updated": 1, "removed": 10, "unchanged": 139}
+    stored = backend.query("SELECT track_id FROM playlist_tracks WHERE playlist_id = $pid", {"pid": PLAYLIST_ID})
+    assert set(stored["track_id"]) == {i["track"]["id"] for i in current}
+
+
+def test_membership_sync_compares_missing_added_at_null_safely(backend, items):
+    current = [{**i, "added_at": None} for i in items[:3]]
+    backend.sync_playlist_tracks(PLAYLIST_ID, members_of(current))
+    assert backend.sync_playlist_tracks(PLAYLIST_ID, members_of(current))["unchanged"] == 3
+
+    current[0] = items[0]
+    assert backend.sync_playlist_tracks(PLAYLIST_ID, members_of(current))["updated"] == 1
+
+
+def test_membership_sync_leaves_other_playlists_alone(backend, items):
+    backend.sync_playlist_tracks("other", members_of(items[:20]))
+    backend.sync_playlist_tracks(PLAYLIST_ID, members_of(items[:50]))
+    backend.sync_playlist_tracks(PLAYLIST_ID, members_of(items[:5]))
+
+    counts = backend.query("SELECT playlist_id, COUNT(*) AS n FROM playlist_tracks GROUP BY playlist_id")
+    assert dict(zip(counts["playlist_id"], counts["n"])) == {"other": 20, PLAYLIST_ID: 5}
+
+
+def test_snapshots_are_appended_once_per_day(backend, items):
+    from etl.snapshots import snapshot_rows
+
+    tracks, artists = frames(items)
+    rows = snapshot_rows(tracks, artists, pd.Timestamp("2024-01-01").date())
+
+    backend.append_snapshots(rows)
+    backend.append_snapshots(rows)
+
+    n = backend.query("SELECT COUNT(*) AS n FROM popularity_snapshots").iloc[0, 0]
+    assert n == len(tracks) + len(artists)
+
+
+def daily_rows(track_id, start, days):
+    dates = pd.date_range(start, periods=days, freq="D")
+    return pd.DataFrame({
+        "snapshot_date": dates, "entity_type": "track", "entity_id": track_id,
+        "popularity": range(days), "followers": None,
+    })
+
+
+@pytest.mark.parametrize("max_points, periods", [
+    (60, pd.date_range("2024-01-01", periods=35, freq="D")),
+    (10, pd.date_range("2024-01-01", periods=5, freq="W-MON")),
+    (4, pd.to_datetime(["2024-01-01", "2024-02-01"])),
+])
+def test_popularity_trend_downsamples_to_the_chosen_bucket(backend, max_points, periods):
+    # 2024-01-01 is a Monday, so weeks start on the first day
+    backend.append_snapshots(daily_rows("t1", "2024-01-01", 35))
+    backend.append_snapshots(daily_rows("t2", "2024-01-01", 35))
+
+    trend = backend.popularity_trend("track", ["t1"], date(2024, 1, 1), date(2024, 2, 5), max_points)
+
+    assert trend["entity_id"].unique().tolist() == ["t1"]
+    assert list(trend["period"]) == list(periods)
+    # Popularity is the day index, so each bucket averages its days' indexes
+    days = pd.Series(range(35), index=pd.date_range("2024-01-01", periods=35, freq="D"))
+    bucket_start = days.index.to_period({60: "D", 10: "W", 4: "M"}[max_points]).start_time
+    expected = days.groupby(bucket_start).mean()
+    assert trend["popularity"].tolist() == pytest.approx(expected.tolist())
+
+
+def test_popularity_trend_filters_the_date_range(backend):
+    backend.append_snapshots(daily_rows("t1", "2024-01-01", 10))
+
+    trend = backend.popularity_trend("track", ["t1"], date(2024, 1, 3), date(2024, 1, 6))
+
+    assert list(trend["period"]) == list(pd.date_range("2024-01-03", "2024-01-05"))
+    assert backend.popularity_trend("track", [], date(2024, 1, 1), date(2024, 2, 1)).empty
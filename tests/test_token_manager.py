@@ -0,0 +1,59 @@
+# tests/test_token_manager.py
+
+import json
+from types import SimpleNamespace
+import pytest
+from etl import token_manager
+from etl.token_manager import TokenManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(token_manager, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def issuer():
+    issued = []
+
+    def fetch():
+        issued.append(f"token-{len(issued) + 1}")
+        return issued[-1], 3600
+
+    return fetch, issued
+
+
+def test_token_is_reused_until_the_refresh_margin(clock, tmp_path):
+    fetch, issued = issuer()
+    tokens = TokenManager(fetch, "client", tmp_path / "token.json", refresh_margin=60)
+
+    assert tokens.get_token() == "token-1"
+    clock.value += 3600 - 61
+    assert tokens.get_token() == "token-1"
+    clock.value += 1
+    assert tokens.get_token() == "token-2"
+    assert tokens.get_token(force=True) == "token-3"
+
+
+def test_disk_cache_is_shared_per_cache_key(clock, tmp_path):
+    path = tmp_path / "token.json"
+    fetch, issued = issuer()
+    TokenManager(fetch, "client", path).get_token()
+
+    assert TokenManager(fetch, "client", path).get_token() == "token-1"
+    assert TokenManager(fetch, "other-client", path).get_token() == "token-2"
+    assert json.loads(path.read_text())["cache_key"] == "other-client"
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_expired_or_unreadable_cache_is_refetched(clock, tmp_path):
+    path = tmp_path / "token.json"
+    fetch, issued = issuer()
+    TokenManager(fetch, "client", path).get_token()
+
+    clock.value += 3600
+    assert TokenManager(fetch, "client", path).get_token() == "token-2"
+    path.write_text("{not json")
+    assert TokenManager(fetch, "client", path).get_token() == "token-3"
+    assert TokenManager(fetch, "client", cache_path=None).get_token() == "token-4"
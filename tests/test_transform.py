@@ -0,0 +1,115 @@
+# tests/test_transform.py
+
+import numpy as np
+import pandas as pd
+from etl.benchmarks import _normalize_tracks_rowwise
+from etl.fake_spotify import generate_dataset
+from etl.transform import normalize_tracks, transform_chunks, song_key, song_keys, _parse_added_at
+
+NAMES = [
+    "Dynamite (Tropical Remix) - Japanese ver.", "봄날 (Spring Day)", "IDOL - 한국어 Ver.",
+    "Butter (Hotter Remix)　", "ON - Instrumental", "Euphoria - REMIX", "FAKE LOVE - Rocking Vibe Mix",
+    "Mic Drop (Steve Aoki Remix) (Full Length Edition)", "\xa0Stay Gold (Original Ver.) - Japanese Ver.",
+    "A-B (c", "", None,
+]
+
+
+def test_song_keys_match_song_key():
+    # Repeats and missing names in between, as in a playlist of many versions
+    names = NAMES + NAMES[::-1] + [None, NAMES[0]]
+    song_key.cache_clear()
+
+    keys = song_keys(np.array(names, dtype=object))
+
+    # One lookup per distinct name; missing names never reach the memo
+    assert song_key.cache_info().misses == len(set(NAMES) - {None})
+    assert keys.tolist() == [song_key(n) for n in names]
+    assert song_key("Dynamite (Tropical Remix) - Japanese ver.") == "Dynamite"
+
+
+def test_list_and_iterator_inputs_agree():
+    items = generate_dataset(300, 20)["playlists"]["fakeplaylist0000000000"]["items"]
+    items = items + items[:10] + [{"added_at": None, "track": None}]
+
+    from_list = normalize_tracks(items, "p", "pid")
+    from_iter = normalize_tracks(iter(items), "p", "pid")
+
+    pd.testing.assert_frame_equal(from_list, from_iter)
+    assert len(from_list) == 300
+
+
+def test_matches_the_rowwise_implementation_on_edge_cases():
+    items = [
+        {"added_at": "2020-01-01T00:00:00Z",
+         "track": {"id": f"t{i}", "name": name, "popularity": i, "duration_ms": 1000 + i,
+                   "album": {"name": "Album"}, "artists": [{"id": f"a{i % 3}", "name": f"Artist {i % 3}"}]}}
+        for i, name in enumerate(NAMES)
+    ]
+    items += [
+        {"added_at": "2020-01-02T03:04:05Z", "track": None},
+        {"added_at": "2020-01-02T03:04:05Z", "track": {"id": "local", "name": "Local file", "artists": []}},
+        {"added_at": "2021-01-01T00:00:00Z", "track": {**items[0]["track"], "name": "Duplicate"}},
+    ]
+
+    columnar = normalize_tracks(items, "p", "pid")
+    rowwise = _normalize_tracks_rowwise(items, "p", "pid").reset_index(drop=True)
+
+    columns = [c for c in rowwise.columns if c != "added_at"]
+    pd.testing.assert_frame_equal(columnar[columns], rowwise[columns], check_dtype=False)
+    assert (columnar["added_at"] == pd.to_datetime(rowwise["added_at"])).all()
+    assert columnar["base_name"].tolist()[:len(NAMES) - 1] == [
+        "Dynamite", "봄날", "IDOL", "Butter", "ON", "Euphoria", "FAKE LOVE - Rocking Vibe Mix",
+        "Mic Drop", "Stay Gold", "A-B (c", "",
+    ]
+    assert pd.isna(columnar["base_name"].iloc[len(NAMES) - 1])
+
+
+def test_irregular_items():
+    items = [
+        {"added_at": "2020-01-01T00:00:00Z",
+         "track": {"id": "a", "name": "Local file", "artists": [], "album": None}},
+        {"added_at": "2020-01-02T00:00:00Z",
+         "track": {"id": "b", "name": "Song - Remix", "popularity": 5, "duration_ms": 1000,
+                   "album": {"name": "x"}, "artists": [{"id": "ar", "name": "Artist"}]}},
+    ]
+
+    df = normalize_tracks(items, "p", "pid")
+
+    assert df["track_id"].tolist() == ["a", "b"]
+    assert df["base_name"].tolist() == ["Local file", "Song"]
+    assert pd.isna(df["artist_id"].iloc[0])
+
+
+def test_parse_added_at_handles_offsets_and_nulls():
+    parsed = _parse_added_at(np.array(
+        ["2020-01-01T09:00:00+09:00", "2020-01-01T00:00:00Z", None], dtype=object
+    ))
+    assert list(pd.to_datetime(parsed)[:2]) == [pd.Timestamp("2020-01-01")] * 2
+    assert pd.isna(parsed[2])
+
+
+def test_transform_chunks_dedupe_across_chunk_boundaries(fake_api, make_client):
+    state, urls = fake_api(n_tracks=25, n_artists=4)
+    client = make_client(urls)
+    items = state.dataset["playlists"]["testplaylist0000000000"]["items"]
+    # A repeat of item 0 lands in the last chunk, right after a boundary
+    items = items + [items[0]]
+
+    chunks = list(transform_chunks(iter(items), "p", "pid", client, chunk_size=5))
+
+    assert [len(tracks) for tracks, _ in chunks] == [5, 5, 5, 5, 5, 0]
+    tracks = pd.concat([t for t, _ in chunks])
+    assert tracks["track_id"].tolist() == [i["track"]["id"] for i in items[:25]]
+    # Each artist is enriched once, in the chunk that first mentions it
+    artists = pd.concat([a for _, a in chunks])
+    assert sorted(artists["artist_id"]) == sorted(state.dataset["artists"])
+    assert artists["followers"].notna().all()
+
+
+def test_transform_chunks_exact_multiple_and_empty_input(fake_api, make_client):
+    state, urls = fake_api(n_tracks=10, n_artists=3)
+    client = make_client(urls)
+    items = state.dataset["playlists"]["testplaylist0000000000"]["items"]
+
+    assert [len(t) for t, _ in transform_chunks(items, "p", "pid", client, chunk_size=5)] == [5, 5]
+    assert list(transform_chunks([], "p", "pid", client, chunk_size=5)) == []